@@ -0,0 +1,125 @@
+"""
+Micro-benchmark of SyncService sample aggregation
+
+Builds synthetic historyValues payloads (3 active + 3 reactive data points,
+15-minute samples) for growing windows and times aggregate_energy (one dict
+pass) against a pandas groupby and the per-timestamp rescan it replaced.
+Time per sample stays flat for the dict and pandas versions, i.e. they scale
+linearly; the rescan grows with the window. On the pinned pandas 2.1.3 the dict
+pass is several times faster than pandas at every size, so aggregate_energy has no
+pandas path.
+
+    python -m backend.benchmarks.aggregate_energy [--max-days 64]
+"""
+import argparse
+import math
+import random
+import time
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from backend.src.services.sync_service import ACTIVE_TYPES, REACTIVE_TYPES, aggregate_energy, parse_timestamp
+
+# The rescan is quadratic, it is only timed up to this window
+RESCAN_MAX_DAYS = 8
+
+
+def synthetic_payload(days, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2025, 3, 16, tzinfo=timezone.utc)
+    timestamps = [
+        (start + timedelta(minutes=15 * i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for i in range(days * 96)
+    ]
+    return {
+        p_type: [{"timeStamp": ts, "value": round(rng.uniform(-5, 40), 3)} for ts in timestamps]
+        for p_type in ACTIVE_TYPES + REACTIVE_TYPES
+    }
+
+
+def rescan_aggregate(power_data):
+    """The previous algorithm: every timestamp rescans every item of every power type"""
+    timestamps = set()
+    for p_type in ACTIVE_TYPES + REACTIVE_TYPES:
+        for item in power_data.get(p_type, []):
+            timestamps.add(item['timeStamp'])
+
+    records = []
+    for ts in sorted(timestamps):
+        totals = [0, 0]
+        for column, types in enumerate((ACTIVE_TYPES, REACTIVE_TYPES)):
+            for p_type in types:
+                for item in power_data.get(p_type, []):
+                    if item['timeStamp'] == ts:
+                        totals[column] += abs(float(item['value'])) * 0.25
+        records.append((parse_timestamp(ts), totals[0], totals[1]))
+    return records
+
+
+def pandas_aggregate(power_data):
+    """groupby over one frame of all samples, the alternative measured against the dict pass"""
+    frame = pd.concat(
+        [
+            pd.DataFrame(power_data[p_type], columns=['timeStamp', 'value']).assign(is_reactive=p_type in REACTIVE_TYPES)
+            for p_type in ACTIVE_TYPES + REACTIVE_TYPES
+            if power_data.get(p_type)
+        ],
+        ignore_index=True
+    )
+    kwh = pd.to_numeric(frame['value']).abs() * 0.25
+    frame['active'] = kwh.where(~frame['is_reactive'], 0)
+    frame['reactive'] = kwh.where(frame['is_reactive'], 0)
+    totals = frame.groupby('timeStamp', sort=False)[['active', 'reactive']].sum()
+    times = pd.to_datetime(totals.index, utc=True).to_pydatetime()
+    return sorted(zip(times, totals['active'].tolist(), totals['reactive'].tolist()))
+
+
+def best_of(func, payload, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(payload)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def same_records(left, right):
+    return len(left) == len(right) and all(
+        a[0] == b[0] and math.isclose(a[1], b[1], abs_tol=1e-9) and math.isclose(a[2], b[2], abs_tol=1e-9)
+        for a, b in zip(left, right)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-days", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"pandas {pd.__version__}")
+    print(f"{'days':>5} {'samples':>9} {'dict ms':>9} {'us/sample':>10} {'pandas ms':>10} {'us/sample':>10} "
+          f"{'rescan ms':>10} {'us/sample':>10}")
+    days = 1
+    while days <= args.max_days:
+        payload = synthetic_payload(days)
+        samples = sum(len(items) for items in payload.values())
+        dict_seconds, records = best_of(aggregate_energy, payload, args.repeat)
+        pandas_seconds, pandas_records = best_of(pandas_aggregate, payload, args.repeat)
+        if not same_records(records, pandas_records):
+            raise SystemExit(f"aggregate_energy and pandas differ at {days} days")
+
+        rescan = ""
+        if days <= RESCAN_MAX_DAYS:
+            rescan_seconds, expected = best_of(rescan_aggregate, payload, 1)
+            if not same_records(records, expected):
+                raise SystemExit(f"aggregate_energy differs from the rescan at {days} days")
+            rescan = f"{rescan_seconds * 1000:>10.1f} {rescan_seconds / samples * 1e6:>10.2f}"
+
+        print(
+            f"{days:>5} {samples:>9} {dict_seconds * 1000:>9.1f} {dict_seconds / samples * 1e6:>10.2f} "
+            f"{pandas_seconds * 1000:>10.1f} {pandas_seconds / samples * 1e6:>10.2f} {rescan}"
+        )
+        days *= 2
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
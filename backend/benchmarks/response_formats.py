@@ -0,0 +1,86 @@
+"""
+Payload size and serialisation time of the /api/consumption response formats
+
+Renders synthetic power_consumption rows (as fetched with the station join)
+the way FastAPI sends them: the row-dict JSON through jsonable_encoder,
+columnar JSON the same way, and Arrow IPC / Parquet when pyarrow is
+installed. Sizes are reported raw and gzip-compressed.
+
+    python -m backend.benchmarks.response_formats [--rows 10000]
+"""
+import argparse
+import gzip
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from backend.src.services.response_formats import ARROW, COLUMNAR, JSON, PARQUET, format_response, pa
+
+STATIONS = {i: (f"UR{365 + i}", f"Nabíjecí stanice UR{365 + i}") for i in range(1, 8)}
+
+
+def synthetic_rows(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2025, 3, 16)
+    rows = []
+    for i in range(count):
+        station_id = i % len(STATIONS) + 1
+        rows.append({
+            'id': i + 1,
+            'timestamp': start + timedelta(minutes=15 * (i // len(STATIONS))),
+            'station_id': station_id,
+            'active_power_kwh': Decimal(f"{rng.uniform(0, 40):.3f}"),
+            'reactive_power_kwh': Decimal(f"{rng.uniform(0, 10):.3f}"),
+            'created_at': start,
+            'station_code': STATIONS[station_id][0],
+            'station_name': STATIONS[station_id][1],
+        })
+    return rows
+
+
+def render(rows, fmt):
+    response = format_response(rows, fmt)
+    if isinstance(response, dict):
+        # What FastAPI does with a returned dict
+        response = JSONResponse(jsonable_encoder(response))
+    return response.body
+
+
+def best_of(fmt, rows, repeat):
+    best, body = math.inf, b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = render(rows, fmt)
+        best = min(best, time.perf_counter() - started)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    formats = [JSON, COLUMNAR] + ([ARROW, PARQUET] if pa is not None else [])
+    if pa is None:
+        print("pyarrow not installed, skipping arrow and parquet")
+
+    print(f"{args.rows} rows")
+    print(f"{'format':<10} {'bytes':>10} {'gzip bytes':>11} {'ms':>8} {'size vs json':>13} {'time vs json':>13}")
+    baseline = None
+    for fmt in formats:
+        seconds, body = best_of(fmt, rows, args.repeat)
+        compressed = len(gzip.compress(body))
+        baseline = baseline or (len(body), seconds)
+        print(
+            f"{fmt:<10} {len(body):>10} {compressed:>11} {seconds * 1000:>8.1f} "
+            f"{len(body) / baseline[0]:>12.2f}x {seconds / baseline[1]:>12.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
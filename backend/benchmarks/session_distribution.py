@@ -0,0 +1,119 @@
+"""
+Benchmark of the session-to-interval energy distribution
+
+Times distribute_sessions (NumPy) against the per-session datetime loop it
+replaced on synthetic sessions, checks that both produce the same intervals,
+proportions and energies, and that the distributed energy equals the session
+energy.
+
+    python -m backend.benchmarks.session_distribution [--sessions 100000]
+"""
+import argparse
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from backend.src.services.session_distributor import distribute_sessions
+
+
+def synthetic_sessions(count, seed=0):
+    rng = random.Random(seed)
+    origin = datetime(2025, 3, 16)
+    sessions = []
+    for session_id in range(1, count + 1):
+        start = origin + timedelta(seconds=rng.randrange(90 * 86400))
+        # Mostly 5 minutes to 10 hours; every 500th session has zero duration
+        duration = 0 if session_id % 500 == 0 else rng.randrange(300, 36000)
+        sessions.append({
+            'id': session_id,
+            'station_id': rng.randint(1, 7),
+            'start_date': start,
+            'end_date': start + timedelta(seconds=duration),
+            'total_kwh': round(rng.uniform(0.5, 80), 3)
+        })
+    return sessions
+
+
+def round_to_15min(dt):
+    return dt.replace(minute=(dt.minute // 15) * 15, second=0, microsecond=0)
+
+
+def loop_distribute(sessions):
+    """The previous per-session loop over 15-minute intervals"""
+    records = []
+    skipped = 0
+    for session in sessions:
+        start, end = session['start_date'], session['end_date']
+        total_kwh = float(session['total_kwh'])
+        total_minutes = (end - start).total_seconds() / 60
+        if total_minutes <= 0:
+            skipped += 1
+            continue
+
+        current_interval = round_to_15min(start)
+        last_interval = round_to_15min(end)
+        while current_interval <= last_interval:
+            interval_end = current_interval + timedelta(minutes=15)
+            overlap_minutes = (min(end, interval_end) - max(start, current_interval)).total_seconds() / 60
+            if overlap_minutes > 0:
+                proportion = overlap_minutes / total_minutes
+                records.append((
+                    session['id'], session['station_id'], current_interval,
+                    total_kwh * proportion, proportion, overlap_minutes
+                ))
+            current_interval = interval_end
+    return records, skipped
+
+
+def timed(func, sessions):
+    started = time.perf_counter()
+    result = func(sessions)
+    return time.perf_counter() - started, result
+
+
+def check_equivalent(sessions, loop_result, numpy_result):
+    (loop_records, loop_skipped), (numpy_records, numpy_skipped) = loop_result, numpy_result
+    if loop_skipped != numpy_skipped or len(loop_records) != len(numpy_records):
+        raise SystemExit(
+            f"Record counts differ: loop {len(loop_records)} (+{loop_skipped} skipped), "
+            f"numpy {len(numpy_records)} (+{numpy_skipped} skipped)"
+        )
+
+    expected = {(record[0], record[2]): record for record in loop_records}
+    for record in numpy_records:
+        reference = expected.get((record[0], record[2]))
+        if reference is None or reference[1] != record[1] or not all(
+            math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12) for a, b in zip(reference[3:], record[3:])
+        ):
+            raise SystemExit(f"Record differs: loop {reference}, numpy {record}")
+
+    # Energy conservation per session, the guarantee distribute_session_energy logs
+    distributed = defaultdict(float)
+    for record in numpy_records:
+        distributed[record[0]] += record[3]
+    for session in sessions:
+        if session['end_date'] > session['start_date']:
+            if not math.isclose(distributed[session['id']], float(session['total_kwh']), rel_tol=1e-9):
+                raise SystemExit(f"Energy not conserved for session {session['id']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100000)
+    args = parser.parse_args()
+
+    sessions = synthetic_sessions(args.sessions)
+    loop_seconds, loop_result = timed(loop_distribute, sessions)
+    numpy_seconds, numpy_result = timed(distribute_sessions, sessions)
+    check_equivalent(sessions, loop_result, numpy_result)
+
+    records = len(numpy_result[0])
+    print(f"{len(sessions)} sessions -> {records} interval records ({numpy_result[1]} skipped)")
+    print(f"loop   {loop_seconds:8.2f} s  {loop_seconds / records * 1e6:6.2f} us/record")
+    print(f"numpy  {numpy_seconds:8.2f} s  {numpy_seconds / records * 1e6:6.2f} us/record")
+    print(f"speedup {loop_seconds / numpy_seconds:.1f}x, results equivalent, energy conserved")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,39 +1,26 @@
 import asyncio
 import logging
-from datetime import datetime, timedelta
-# Importuj tvůj upravený SyncService
-from backend.src.services.sync_service import SyncService
+from datetime import datetime
+from backend.src.config import settings
+from backend.src.services.backfill_engine import BackfillEngine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("BackfillService")
 
 async def main():
-    service = SyncService()
+    # Datum, kdy začaly první session (podle dat 24. 2. 2025)
+    start_date = datetime.fromisoformat(settings.backfill_config.get('start_date', '2025-02-24'))
+    # Končíme začátkem dneška, aktuální den řeší pravidelná synchronizace
+    end_date = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
 
-    # Nastav datum, kdy začaly první session (podle tvých dat 24. 2. 2025)
-    start_date = datetime(2025, 2, 24)
-    # Končíme včerejškem
-    end_date = datetime.utcnow() - timedelta(days=1)
+    logger.info(f">>> Backfill od {start_date.date()} do {end_date.date()}")
 
-    current = start_date
-    while current <= end_date:
-        day_start = current.replace(hour=0, minute=0, second=0)
-        day_end = current.replace(hour=23, minute=59, second=59)
+    # Hotové úseky se ukládají do backfill_checkpoints, přerušený běh
+    # po novém spuštění pokračuje tam, kde skončil
+    engine = BackfillEngine()
+    records = await engine.run(start_date, end_date)
 
-        logger.info(f">>> Stahuji data pro den: {day_start.strftime('%Y-%m-%d')}")
-
-        try:
-            records = await service.sync_all_stations_in_range(day_start, day_end)
-            logger.info(f"Úspěšně uloženo {records} záznamů.")
-
-            # Důležité: Malá pauza, abychom byli na API hodní
-            await asyncio.sleep(1.5)
-
-        except Exception as e:
-            logger.error(f"Chyba u dne {day_start}: {e}")
-            await asyncio.sleep(10) # Při chybě počkáme déle
-
-        current += timedelta(days=1)
+    logger.info(f"Úspěšně uloženo {records} záznamů.")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -66,6 +66,14 @@ class Config:
     def database_config(self):
         return self._config['database']
 
+    @property
+    def database_pool_config(self):
+        return self._config.get('database_pool', {})
+
+    @property
+    def bulk_load_config(self):
+        return self._config.get('bulk_load', {})
+
     @property
     def consumption_file(self):
         file_path = self._config['files']['consumption_file']
@@ -96,4 +104,44 @@ class Config:
     def data_points(self):
         return self._config['jasper_vision'].get('data_points', {})
 
+    @property
+    def jasper_max_in_flight(self):
+        return self._config['jasper_vision'].get('max_in_flight_requests', 8)
+
+    @property
+    def jasper_max_connections(self):
+        return self._config['jasper_vision'].get('max_connections', 10)
+
+    @property
+    def jasper_max_keepalive_connections(self):
+        return self._config['jasper_vision'].get('max_keepalive_connections', 10)
+
+    @property
+    def jasper_max_window_days(self):
+        return self._config['jasper_vision'].get('max_window_days', 7)
+
+    @property
+    def jasper_resilience_config(self):
+        return self._config['jasper_vision'].get('resilience', {})
+
+    @property
+    def backfill_config(self):
+        return self._config.get('backfill', {})
+
+    @property
+    def cache_config(self):
+        return self._config.get('cache', {})
+
+    @property
+    def jobs_config(self):
+        return self._config.get('jobs', {})
+
+    @property
+    def recalculation_config(self):
+        return self._config.get('recalculation', {})
+
+    @property
+    def scheduler_config(self):
+        return self._config.get('scheduler', {})
+
 settings = Config()
\ No newline at end of file
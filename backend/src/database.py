@@ -1,12 +1,377 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import logging
 import mysql.connector
 from mysql.connector import Error
 from backend.src.config import settings
+from backend.src.services.metrics import DB_QUERY_SECONDS, current_route
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of mysql.connector connections
+
+    Connections are opened lazily up to pool_size. A checkout waits up to
+    checkout_timeout seconds for a free connection, pings it first when
+    pre_ping is enabled and replaces connections older than recycle_seconds.
+    Every connection is rolled back when it returns to the pool so no
+    transaction or read snapshot leaks to the next user.
+    """
+
+    def __init__(self, db_config, pool_size=10, checkout_timeout=30, pre_ping=True, recycle_seconds=3600):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.pre_ping = pre_ping
+        self.recycle_seconds = recycle_seconds
+
+        self._condition = threading.Condition()
+        self._idle = []
+        self._created_at = {}  # id(connection) -> monotonic time of connect
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._created = 0
+        self._discarded = 0
+        self._checkouts = 0
+
+    def _connect(self):
+        try:
+            connection = mysql.connector.connect(**self.db_config)
+        except Error as e:
+            logger.error(f"Error connecting to MySQL: {e}")
+            raise Exception("Database connection failed")
+
+        with self._condition:
+            self._created += 1
+            self._created_at[id(connection)] = time.monotonic()
+        return connection
+
+    def _discard(self, connection):
+        self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _is_healthy(self, connection) -> bool:
+        created_at = self._created_at.get(id(connection), 0)
+        if self.recycle_seconds and time.monotonic() - created_at > self.recycle_seconds:
+            return False
+        if not self.pre_ping:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def acquire(self):
+        """Check a connection out of the pool, opening a new one if there is room"""
+        deadline = time.monotonic() + self.checkout_timeout
+        connection = None
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._open < self.pool_size:
+                    self._open += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception("Timed out waiting for a database connection")
+
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._in_use += 1
+            self._checkouts += 1
+
+        try:
+            if connection is not None and not self._is_healthy(connection):
+                with self._condition:
+                    self._discarded += 1
+                self._discard(connection)
+                connection = None
+
+            if connection is None:
+                connection = self._connect()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
 
-def get_db_connection():
-    """Create and return a database connection"""
-    try:
-        connection = mysql.connector.connect(**settings.database_config)
         return connection
-    except Error as e:
-        print(f"Error connecting to MySQL: {e}")
-        raise Exception("Database connection failed")
\ No newline at end of file
+
+    def release(self, connection):
+        """Return a connection to the pool"""
+        healthy = True
+        try:
+            connection.rollback()
+        except Error:
+            healthy = False
+
+        with self._condition:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append(connection)
+            else:
+                self._open -= 1
+                self._discarded += 1
+            self._condition.notify()
+
+        if not healthy:
+            self._discard(connection)
+
+    def invalidate(self, connection):
+        """Close a checked-out connection instead of returning it; the pool opens a new one when needed"""
+        with self._condition:
+            self._in_use -= 1
+            self._open -= 1
+            self._discarded += 1
+            self._condition.notify()
+
+        self._discard(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                "pool_size": self.pool_size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "created": self._created,
+                "discarded": self._discarded,
+                "checkouts": self._checkouts
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool_config = settings.database_pool_config
+                db_config = dict(settings.database_config)
+                if settings.bulk_load_config.get('use_load_data', False):
+                    db_config['allow_local_infile'] = True
+                _pool = ConnectionPool(
+                    db_config,
+                    pool_size=pool_config.get('pool_size', 10),
+                    checkout_timeout=pool_config.get('checkout_timeout_seconds', 30),
+                    pre_ping=pool_config.get('pre_ping', True),
+                    recycle_seconds=pool_config.get('recycle_seconds', 3600)
+                )
+    return _pool
+
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled database connection for the duration of the block"""
+    with get_pool().connection() as connection:
+        yield connection
+
+
+@contextmanager
+def db_cursor(dictionary=True):
+    """Borrow a pooled connection and open a cursor on it; yields (connection, cursor)"""
+    with get_pool().connection() as connection:
+        cursor = connection.cursor(dictionary=dictionary)
+        try:
+            yield connection, cursor
+        finally:
+            cursor.close()
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+_executor = None
+_stream_executor = None
+# Limits concurrent streams, created on first use
+_stream_slots = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Dedicated executor for blocking mysql.connector calls
+    Sized to the pool: every call holds one connection, more threads would only
+    wait in acquire(). A call can still wait there while streams hold connections
+    between fetches; max_streams keeps those from taking the whole pool.
+    """
+    global _executor
+    if _executor is None:
+        pool_size = get_pool().pool_size
+        with _pool_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="db")
+    return _executor
+
+
+def get_stream_executor() -> ThreadPoolExecutor:
+    """
+    Executor for stream_query calls, one worker per allowed concurrent stream
+    Kept apart from get_executor() so stream fetches, which release their
+    connections, never queue behind run_db calls waiting for one
+    """
+    global _stream_executor
+    if _stream_executor is None:
+        with _pool_lock:
+            if _stream_executor is None:
+                _stream_executor = ThreadPoolExecutor(max_workers=_max_streams(), thread_name_prefix="db-stream")
+    return _stream_executor
+
+
+def _max_streams():
+    pool_size = get_pool().pool_size
+    # At least one connection always stays available to run_db
+    return max(1, min(settings.database_pool_config.get('max_streams', 4), pool_size - 1))
+
+
+async def _run_on(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # The executor thread doesn't inherit the request context, so the route is read here
+    timer = DB_QUERY_SECONDS.labels(current_route.get())
+
+    def timed():
+        with timer.time():
+            return func(*args, **kwargs)
+
+    return await loop.run_in_executor(executor, timed)
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking DB function on the DB executor without blocking the event loop"""
+    return await _run_on(get_executor(), func, *args, **kwargs)
+
+
+def _fetch(query, params, one):
+    with db_cursor() as (connection, cursor):
+        cursor.execute(query, params or ())
+        return cursor.fetchone() if one else cursor.fetchall()
+
+
+async def fetch_all(query, params=None):
+    return await run_db(_fetch, query, params, False)
+
+
+async def fetch_one(query, params=None):
+    return await run_db(_fetch, query, params, True)
+
+
+def _close_stream(connection, cursor):
+    if not connection.unread_result:
+        cursor.close()
+        get_pool().release(connection)
+        return
+
+    # Rows left unread (client disconnected or the stream failed). Closing or
+    # rolling back would read the whole remaining result first, so the query is
+    # stopped on the server and the connection dropped instead of reused.
+    try:
+        with db_cursor() as (_, killer):
+            killer.execute("KILL QUERY %s", (connection.connection_id,))
+    except Exception as e:
+        logger.warning(f"Could not stop abandoned stream query: {e}")
+    get_pool().invalidate(connection)
+
+
+# Stream cleanups outlive the cancelled request task, keep them referenced until done
+_stream_cleanups = set()
+
+
+def _start_cleanup(coroutine):
+    cleanup = asyncio.ensure_future(coroutine)
+    _stream_cleanups.add(cleanup)
+    cleanup.add_done_callback(_stream_cleanups.discard)
+    return cleanup
+
+
+async def _abandon_checkout(acquiring):
+    # Cancelled while waiting for a connection: return it once the checkout completes
+    try:
+        connection = await acquiring
+        await _run_on(get_stream_executor(), get_pool().release, connection)
+    except Exception:
+        pass
+    finally:
+        _stream_slots.release()
+
+
+async def _finish_stream(connection, cursor, in_flight):
+    try:
+        # The executor call can't be interrupted; close only once it no longer uses the connection
+        if in_flight is not None:
+            try:
+                await in_flight
+            except Exception:
+                pass
+        await _run_on(get_stream_executor(), _close_stream, connection, cursor)
+    finally:
+        _stream_slots.release()
+
+
+async def stream_query(query, params=None, batch_size=500):
+    """
+    Execute a query with an unbuffered cursor and yield rows in batches as the driver reads them
+    Keeps one pooled connection for the lifetime of the stream
+
+    At most max_streams run at once, each on the stream executor. A client
+    disconnect cancels the consumer while a fetch may still run on the
+    executor, so every call runs as its own task behind asyncio.shield and
+    the connection is returned by a cleanup task that waits for it.
+    """
+    global _stream_slots
+    if _stream_slots is None:
+        _stream_slots = asyncio.Semaphore(_max_streams())
+
+    executor = get_stream_executor()
+    await _stream_slots.acquire()
+    acquiring = asyncio.ensure_future(_run_on(executor, get_pool().acquire))
+    try:
+        connection = await asyncio.shield(acquiring)
+    except BaseException:
+        _start_cleanup(_abandon_checkout(acquiring))
+        raise
+
+    cursor = connection.cursor(dictionary=True)
+    in_flight = None
+    try:
+        in_flight = asyncio.ensure_future(_run_on(executor, cursor.execute, query, params or ()))
+        await asyncio.shield(in_flight)
+        while True:
+            in_flight = asyncio.ensure_future(_run_on(executor, cursor.fetchmany, batch_size))
+            rows = await asyncio.shield(in_flight)
+            if not rows:
+                break
+            yield rows
+    finally:
+        await asyncio.shield(_start_cleanup(_finish_stream(connection, cursor, in_flight)))
\ No newline at end of file
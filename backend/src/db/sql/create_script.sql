@@ -18,7 +18,8 @@ CREATE TABLE IF NOT EXISTS power_consumption (
 reactive_power_kwh DECIMAL(10, 3) NOT NULL,
 FOREIGN KEY (station_id) REFERENCES stations(id),
 INDEX idx_timestamp (timestamp),
-INDEX idx_station_time (station_id, timestamp)
+INDEX idx_station_time (station_id, timestamp),
+UNIQUE KEY unique_station_time (station_id, timestamp)
 );
 
 -- Table: charging_sessions
@@ -31,7 +32,10 @@ end_date DATETIME,
 total_kwh DECIMAL(10, 3) NOT NULL,
 start_card VARCHAR(50),
 end_interval_15min DATETIME NOT NULL,
+session_key CHAR(40) NULL,
+content_hash CHAR(40) NULL,
 FOREIGN KEY (station_id) REFERENCES stations(id),
+UNIQUE KEY unique_session_key (session_key),
 INDEX idx_end_interval (end_interval_15min),
 INDEX idx_station_interval (station_id, end_interval_15min)
 );
@@ -51,3 +55,83 @@ UNIQUE KEY unique_station_period (station_id, period_start, period_end),
 INDEX idx_period (period_start, period_end)
 );
 ALTER TABLE loss_analysis MODIFY loss_percentage DECIMAL(10, 2);
+
+
+-- Table: backfill_checkpoints (completed backfill chunks per station and data point)
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+station_id INT NOT NULL,
+data_point_id VARCHAR(100) NOT NULL,
+chunk_start DATETIME NOT NULL,
+chunk_end DATETIME NOT NULL,
+rows_fetched INT NOT NULL DEFAULT 0,
+completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+PRIMARY KEY (station_id, data_point_id, chunk_start, chunk_end),
+FOREIGN KEY (station_id) REFERENCES stations(id)
+);
+
+-- Table: loss_dirty_partitions ((station, day) partitions waiting for incremental loss recalculation)
+CREATE TABLE IF NOT EXISTS loss_dirty_partitions (
+station_id INT NOT NULL,
+calc_date DATE NOT NULL,
+marked_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+PRIMARY KEY (station_id, calc_date),
+FOREIGN KEY (station_id) REFERENCES stations(id)
+);
+
+-- Table: consumption_hourly (hourly rollup of power_consumption per station, refreshed on every sync)
+CREATE TABLE IF NOT EXISTS consumption_hourly (
+station_id INT NOT NULL,
+hour_start DATETIME NOT NULL,
+sample_count INT NOT NULL,
+negative_count INT NOT NULL,
+active_sum DECIMAL(14, 3) NOT NULL,
+active_abs_sum DECIMAL(14, 3) NOT NULL,
+active_min DECIMAL(10, 3) NOT NULL,
+active_max DECIMAL(10, 3) NOT NULL,
+reactive_sum DECIMAL(14, 3) NOT NULL,
+reactive_abs_sum DECIMAL(14, 3) NOT NULL,
+reactive_min DECIMAL(10, 3) NOT NULL,
+reactive_max DECIMAL(10, 3) NOT NULL,
+first_sample DATETIME NOT NULL,
+last_sample DATETIME NOT NULL,
+PRIMARY KEY (station_id, hour_start),
+FOREIGN KEY (station_id) REFERENCES stations(id)
+);
+
+-- Table: consumption_daily (daily rollup of power_consumption per station, refreshed on every sync)
+CREATE TABLE IF NOT EXISTS consumption_daily (
+station_id INT NOT NULL,
+calc_date DATE NOT NULL,
+sample_count INT NOT NULL,
+negative_count INT NOT NULL,
+active_sum DECIMAL(14, 3) NOT NULL,
+active_abs_sum DECIMAL(14, 3) NOT NULL,
+active_min DECIMAL(10, 3) NOT NULL,
+active_max DECIMAL(10, 3) NOT NULL,
+reactive_sum DECIMAL(14, 3) NOT NULL,
+reactive_abs_sum DECIMAL(14, 3) NOT NULL,
+reactive_min DECIMAL(10, 3) NOT NULL,
+reactive_max DECIMAL(10, 3) NOT NULL,
+first_sample DATETIME NOT NULL,
+last_sample DATETIME NOT NULL,
+PRIMARY KEY (station_id, calc_date),
+FOREIGN KEY (station_id) REFERENCES stations(id)
+);
+
+-- Table: distributed_sessions (session energy split into 15-minute intervals, rebuilt by the loss calculator)
+CREATE TABLE IF NOT EXISTS distributed_sessions (
+id INT AUTO_INCREMENT PRIMARY KEY,
+session_id INT NOT NULL,
+station_id INT NOT NULL,
+interval_15min DATETIME NOT NULL,
+energy_kwh DECIMAL(10, 3) NOT NULL,
+proportion DECIMAL(5, 4) NOT NULL,
+overlap_minutes DECIMAL(6, 2) NOT NULL,
+interval_date DATE AS (DATE(interval_15min)) STORED,
+FOREIGN KEY (session_id) REFERENCES charging_sessions(id),
+FOREIGN KEY (station_id) REFERENCES stations(id),
+UNIQUE KEY unique_session_interval (session_id, interval_15min),
+INDEX idx_interval (interval_15min),
+INDEX idx_station_interval (station_id, interval_15min),
+INDEX idx_station_date (station_id, interval_date)
+);
\ No newline at end of file
@@ -1,11 +1,17 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 from backend.src.config import settings
-from backend.src.database import get_db_connection
-from backend.src.routes import stations, consumption, sessions, losses
-from backend.src.services.sync_service import SyncService
-from backend.src.services.scheduler import DataScheduler
+from backend.src.database import db_cursor, pool_stats, run_db
+from backend.src.routes import stations, consumption, sessions, losses, jobs
+from backend.src.services.sync_service import ensure_consumption_key
+from backend.src.services.scheduler import DataScheduler, INITIAL, MANUAL
+from backend.src.services.proper_loss_calculator import ensure_loss_tables
+from backend.src.services.rollups import rebuild_rollups_if_empty
+from backend.src.services.response_cache import cached_response, response_cache
+from backend.src.services.jobs import job_manager
+from backend.src.services import metrics
 import logging
 
 
@@ -31,10 +37,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(metrics.RouteMetricsMiddleware)
+
 app.include_router(stations.router)
 app.include_router(consumption.router)
 app.include_router(sessions.router)
 app.include_router(losses.router)
+app.include_router(jobs.router)
 
 @app.on_event("startup")
 async def startup_event():
@@ -45,30 +54,32 @@ async def startup_event():
     logger.info("Data source: Jasper Vision API")
     logger.info(f"Base URL: {settings.jasper_config['base_url']}")
 
+    def check_database():
+        with db_cursor() as (connection, cursor):
+            ensure_loss_tables(cursor, connection)
+            ensure_consumption_key(cursor, connection)
+            rebuild_rollups_if_empty(cursor, connection)
+
+            cursor.execute("SELECT COUNT(*) as count FROM stations")
+            result = cursor.fetchone()
+            logger.info(f"Stations configured: {result['count']}")
+
+            cursor.execute("SELECT SUM(sample_count) as count FROM consumption_daily")
+            result = cursor.fetchone()
+            logger.info(f"Existing consumption records: {result['count'] or 0}")
+
+            cursor.execute("""
+                SELECT MAX(last_sample) as last_timestamp 
+                FROM consumption_daily
+            """)
+            result = cursor.fetchone()
+            if result and result['last_timestamp']:
+                logger.info(f"Last data point: {result['last_timestamp']}")
+            else:
+                logger.info("No data yet - will start from 2025-11-11 08:30:00")
+
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        cursor.execute("SELECT COUNT(*) as count FROM stations")
-        result = cursor.fetchone()
-        logger.info(f"Stations configured: {result['count']}")
-
-        cursor.execute("SELECT COUNT(*) as count FROM power_consumption")
-        result = cursor.fetchone()
-        logger.info(f"Existing consumption records: {result['count']}")
-
-        cursor.execute("""
-            SELECT MAX(timestamp) as last_timestamp 
-            FROM power_consumption
-        """)
-        result = cursor.fetchone()
-        if result and result['last_timestamp']:
-            logger.info(f"Last data point: {result['last_timestamp']}")
-        else:
-            logger.info("No data yet - will start from 2025-11-11 08:30:00")
-
-        cursor.close()
-        connection.close()
+        await run_db(check_database)
         logger.info("Database connection successful")
 
     except Exception as e:
@@ -83,7 +94,8 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    data_scheduler.stop()
+    await data_scheduler.stop()
+    job_manager.shutdown()
     logger.info("Shutting down...")
 
 @app.get("/")
@@ -102,86 +114,111 @@ async def root():
             "consumption": "/api/consumption",
             "sessions": "/api/sessions",
             "losses": "/api/losses",
+            "jobs": "/api/jobs",
             "sync_now": "/api/sync-now",
             "initial_sync": "/api/initial-sync",
+            "db_pool": "/api/db-pool",
+            "scheduler": "/api/scheduler",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
 
 @app.get("/api/data-status")
-async def data_status():
+async def data_status(request: Request):
     """Check what data is available"""
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT 
-                MIN(timestamp) as first_consumption,
-                MAX(timestamp) as last_consumption,
-                COUNT(*) as consumption_count
-            FROM power_consumption
-        """)
-        consumption_info = cursor.fetchone()
-
-        cursor.execute("""
-            SELECT 
-                MIN(end_date) as first_session,
-                MAX(end_date) as last_session,
-                COUNT(*) as session_count
-            FROM charging_sessions
-        """)
-        session_info = cursor.fetchone()
-
-        cursor.execute("""
-            SELECT 
-                MIN(period_start) as first_loss,
-                MAX(period_end) as last_loss,
-                COUNT(*) as loss_count
-            FROM loss_analysis
-        """)
-        loss_info = cursor.fetchone()
-
-        cursor.close()
-        connection.close()
+    def load_status():
+        with db_cursor() as (connection, cursor):
+            cursor.execute("""
+                SELECT 
+                    MIN(first_sample) as first_consumption,
+                    MAX(last_sample) as last_consumption,
+                    CAST(COALESCE(SUM(sample_count), 0) AS UNSIGNED) as consumption_count
+                FROM consumption_daily
+            """)
+            consumption_info = cursor.fetchone()
 
-        return {
-            "success": True,
-            "consumption": {
-                "first_date": consumption_info['first_consumption'].isoformat() if consumption_info['first_consumption'] else None,
-                "last_date": consumption_info['last_consumption'].isoformat() if consumption_info['last_consumption'] else None,
-                "count": consumption_info['consumption_count']
-            },
-            "sessions": {
-                "first_date": session_info['first_session'].isoformat() if session_info['first_session'] else None,
-                "last_date": session_info['last_session'].isoformat() if session_info['last_session'] else None,
-                "count": session_info['session_count']
-            },
-            "losses": {
-                "first_date": loss_info['first_loss'].isoformat() if loss_info['first_loss'] else None,
-                "last_date": loss_info['last_loss'].isoformat() if loss_info['last_loss'] else None,
-                "count": loss_info['loss_count']
+            cursor.execute("""
+                SELECT 
+                    MIN(end_date) as first_session,
+                    MAX(end_date) as last_session,
+                    COUNT(*) as session_count
+                FROM charging_sessions
+            """)
+            session_info = cursor.fetchone()
+
+            cursor.execute("""
+                SELECT 
+                    MIN(period_start) as first_loss,
+                    MAX(period_end) as last_loss,
+                    COUNT(*) as loss_count
+                FROM loss_analysis
+            """)
+            loss_info = cursor.fetchone()
+
+        return consumption_info, session_info, loss_info
+
+    async def load():
+        try:
+            consumption_info, session_info, loss_info = await run_db(load_status)
+
+            return {
+                "success": True,
+                "consumption": {
+                    "first_date": consumption_info['first_consumption'].isoformat() if consumption_info['first_consumption'] else None,
+                    "last_date": consumption_info['last_consumption'].isoformat() if consumption_info['last_consumption'] else None,
+                    "count": consumption_info['consumption_count']
+                },
+                "sessions": {
+                    "first_date": session_info['first_session'].isoformat() if session_info['first_session'] else None,
+                    "last_date": session_info['last_session'].isoformat() if session_info['last_session'] else None,
+                    "count": session_info['session_count']
+                },
+                "losses": {
+                    "first_date": loss_info['first_loss'].isoformat() if loss_info['first_loss'] else None,
+                    "last_date": loss_info['last_loss'].isoformat() if loss_info['last_loss'] else None,
+                    "count": loss_info['loss_count']
+                }
             }
-        }
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    return await cached_response(request, load)
+
+@app.get("/api/db-pool")
+async def db_pool_status():
+    """Database connection pool and response cache statistics"""
+    return {"success": True, "pool": pool_stats(), "cache": response_cache.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus metrics in text exposition format"""
+    body, content_type = metrics.render(pool_stats(), response_cache.stats())
+    return Response(content=body, media_type=content_type)
+
+@app.get("/api/scheduler")
+async def scheduler_status():
+    """Scheduler state, next tick and per-run timing/lag metrics"""
+    return {"success": True, "scheduler": data_scheduler.status()}
 
 @app.post("/api/sync-now")
 async def sync_now():
     """
     Manually trigger data synchronization
-    Will sync from last record to now
+    Will sync from last record to now; joins the scheduled sync if one is running
     """
     try:
         logger.info("Manual sync triggered via API")
-        sync_service = SyncService()
-        records = await sync_service.sync_all_stations()
+        run = await data_scheduler.run_sync(MANUAL)
+        records = run["records"]
 
         logger.info(f"Manual sync completed: {records} records")
 
         return {
             "success": True,
             "message": f"Synchronized {records} records",
+            "coalesced": run["coalesced"],
+            "duration_seconds": run["duration_seconds"],
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -193,14 +230,15 @@ async def initial_sync(days_back: int = 7):
     """
     Perform initial historical data sync
     Use this for first-time setup or to reload historical data
+    Runs through the scheduler, after a sync that is already running
 
     Parameters:
     - days_back: Number of days to sync backwards (default: 7)
     """
     try:
         logger.info(f"Initial sync triggered via API: {days_back} days back")
-        sync_service = SyncService()
-        records = await sync_service.initial_sync(days_back)
+        run = await data_scheduler.run_sync(INITIAL, days_back=days_back)
+        records = run["records"]
 
         logger.info(f"Initial sync completed: {records} records")
 
@@ -208,6 +246,8 @@ async def initial_sync(days_back: int = 7):
             "success": True,
             "message": f"Initial sync completed with {records} records",
             "days_back": days_back,
+            "coalesced": run["coalesced"],
+            "duration_seconds": run["duration_seconds"],
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
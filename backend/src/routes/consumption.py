@@ -1,20 +1,46 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException
 from typing import Optional
-from backend.src.database import get_db_connection
+from backend.src.database import fetch_all, stream_query
+from backend.src.services.pagination import decode_cursor, keyset_condition, next_cursor, ndjson_response
+from backend.src.services.response_formats import format_response, resolve_format
+from backend.src.services.downsampling import lttb
 
 router = APIRouter(prefix="/api/consumption", tags=["consumption"])
 
+# bucket -> (rollup table, bucket start expression, time column, first and last time column
+# value of the buckets starting within the range); weeks start on Monday
+BUCKETS = {
+    "1h": ("consumption_hourly", "r.hour_start", "r.hour_start", "%s", "%s"),
+    "1d": ("consumption_daily", "TIMESTAMP(r.calc_date)", "r.calc_date", "DATE(%s)", "DATE(%s)"),
+    "1w": (
+        "consumption_daily",
+        "TIMESTAMP(r.calc_date - INTERVAL WEEKDAY(r.calc_date) DAY)",
+        "r.calc_date",
+        # First Monday on or after start_date
+        "DATE(%s) + INTERVAL MOD(7 - WEEKDAY(%s), 7) DAY",
+        # Sunday of the week end_date falls in
+        "DATE(%s) + INTERVAL (6 - WEEKDAY(%s)) DAY"
+    ),
+}
+
 @router.get("")
 async def get_consumption(
         station_id: Optional[int] = None,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        limit: int = 1000
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        stream: bool = False,
+        format: Optional[str] = None,
+        accept: Optional[str] = Header(None)
 ):
-    """Get power consumption data with optional filters"""
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-
+    """
+    Get power consumption data with optional filters
+    Pages are ordered by (timestamp, id) descending; pass next_cursor back as cursor for the next page.
+    With stream=true all matching rows (or up to limit) are sent as NDJSON while they are read.
+    format (or Accept) selects json, columnar, arrow or parquet output for normal pages.
+    """
+    fmt = resolve_format(format, accept)
     query = """
         SELECT pc.*, s.station_code, s.station_name
         FROM power_consumption pc
@@ -35,15 +61,106 @@ async def get_consumption(
         query += " AND pc.timestamp <= %s"
         params.append(end_date)
 
-    query += " ORDER BY pc.timestamp DESC LIMIT %s"
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor)
+        query += keyset_condition("pc.timestamp", "pc.id")
+        params.extend([last_timestamp, last_timestamp, last_id])
+
+    query += " ORDER BY pc.timestamp DESC, pc.id DESC"
+
+    if stream:
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        return ndjson_response(stream_query(query, params))
+
+    limit = limit or 1000
+    query += " LIMIT %s"
     params.append(limit)
 
     try:
-        cursor.execute(query, params)
-        consumption = cursor.fetchall()
-        return {"success": True, "data": consumption}
+        consumption = await fetch_all(query, params)
+        return format_response(consumption, fmt, {"next_cursor": next_cursor(consumption, limit, 'timestamp')})
     except Exception as e:
         return {"success": False, "error": str(e)}
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+
+
+@router.get("/aggregate")
+async def get_consumption_aggregate(
+        bucket: str = "1h",
+        station_id: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        max_points: Optional[int] = None
+):
+    """
+    Get consumption grouped into time buckets (1h, 1d or 1w) per station
+    Read from the hourly/daily rollups; each bucket has sample count and
+    min/avg/max/sum of active and reactive energy.
+    Buckets are selected by their start, so start_date/end_date snap to whole buckets.
+    max_points downsamples every station's series with LTTB on active_sum.
+    """
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(BUCKETS)}")
+
+    table, bucket_expression, time_column, start_placeholder, end_placeholder = BUCKETS[bucket]
+
+    query = f"""
+        SELECT 
+            agg.*,
+            s.station_code,
+            s.station_name
+        FROM (
+            SELECT 
+                r.station_id,
+                {bucket_expression} as bucket_start,
+                CAST(SUM(r.sample_count) AS UNSIGNED) as samples,
+                MIN(r.active_min) as active_min,
+                SUM(r.active_sum) / SUM(r.sample_count) as active_avg,
+                MAX(r.active_max) as active_max,
+                SUM(r.active_sum) as active_sum,
+                MIN(r.reactive_min) as reactive_min,
+                SUM(r.reactive_sum) / SUM(r.sample_count) as reactive_avg,
+                MAX(r.reactive_max) as reactive_max,
+                SUM(r.reactive_sum) as reactive_sum
+            FROM {table} r
+            WHERE 1=1
+    """
+    params = []
+
+    if station_id:
+        query += " AND r.station_id = %s"
+        params.append(station_id)
+
+    # Filtering the time column itself (not the bucket expression) keeps the index usable
+    if start_date:
+        query += f" AND {time_column} >= {start_placeholder}"
+        params.extend([start_date] * start_placeholder.count("%s"))
+
+    if end_date:
+        query += f" AND {time_column} <= {end_placeholder}"
+        params.extend([end_date] * end_placeholder.count("%s"))
+
+    query += """
+            GROUP BY r.station_id, bucket_start
+        ) agg
+        JOIN stations s ON agg.station_id = s.id
+        ORDER BY agg.station_id, agg.bucket_start
+    """
+
+    try:
+        rows = await fetch_all(query, params)
+
+        if max_points:
+            series = {}
+            for row in rows:
+                series.setdefault(row['station_id'], []).append(row)
+            rows = [
+                station_rows[i]
+                for station_rows in series.values()
+                for i in lttb([float(row['active_sum']) for row in station_rows], max_points)
+            ]
+
+        return {"success": True, "bucket": bucket, "data": rows}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
\ No newline at end of file
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from backend.src.services.jobs import job_manager
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+@router.get("")
+async def get_jobs():
+    """List recent background jobs, newest first"""
+    return {"success": True, "data": job_manager.list()}
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Get status, current step, progress counters and timing of a background job"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": job}
\ No newline at end of file
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
 from typing import Optional
-from backend.src.database import get_db_connection
-from backend.src.services.proper_loss_calculator import (
-    recalculate_everything,
-    get_data_quality_report
-)
+from backend.src.database import db_cursor, fetch_all, run_db
+from backend.src.services.proper_loss_calculator import get_data_quality_report
+from backend.src.services.jobs import job_manager
+from backend.src.services.response_formats import format_response, resolve_format
+from backend.src.services.response_cache import cached_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,14 +13,15 @@ router = APIRouter(prefix="/api/losses", tags=["losses"])
 
 @router.get("")
 async def get_losses(
+        request: Request,
         station_id: Optional[int] = None,
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        format: Optional[str] = None,
+        accept: Optional[str] = Header(None)
 ):
-    """Get loss analysis data"""
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-
+    """Get loss analysis data (format or Accept: json, columnar, arrow, parquet)"""
+    fmt = resolve_format(format, accept)
     query = """
         SELECT la.*, s.station_code, s.station_name
         FROM loss_analysis la
@@ -43,92 +44,84 @@ async def get_losses(
 
     query += " ORDER BY la.period_start DESC"
 
-    try:
-        cursor.execute(query, params)
-        losses = cursor.fetchall()
-        return {"success": True, "data": losses}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
-    finally:
-        cursor.close()
-        connection.close()
+    async def load():
+        try:
+            losses = await fetch_all(query, params)
+            return format_response(losses, fmt)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    return await cached_response(request, load)
 
 
-@router.post("/recalculate")
-async def recalculate_losses():
+@router.post("/recalculate", status_code=202)
+async def recalculate_losses(incremental: bool = False):
     """
     PROPER loss recalculation with session energy distribution
     This is the CORRECT method that fixes negative losses
-    """
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
 
-    try:
-        logger.info("🔄 Manual recalculation triggered via API")
+    Runs as a background job in a worker process and returns its id right away;
+    poll GET /api/jobs/{job_id} for step, progress and timing.
+    A request already covered by a running recalculation joins that job.
 
-        recalculate_everything(cursor, connection)
+    Parameters:
+    - incremental: Only recalculate (station, day) partitions changed since the last run
+    """
+    try:
+        job, coalesced = job_manager.submit_recalculation(incremental)
 
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_records,
-                MIN(period_start) as first_date,
-                MAX(period_end) as last_date,
-                AVG(loss_percentage) as avg_loss_pct
-            FROM loss_analysis
-        """)
-        summary = cursor.fetchone()
+        if coalesced:
+            logger.info(f"🔄 Recalculation request joined running job {job.id}")
+        else:
+            logger.info(f"🔄 Manual recalculation triggered via API (job {job.id})")
 
         return {
             "success": True,
-            "message": "Losses recalculated with proper session distribution",
-            "summary": {
-                "total_records": summary['total_records'],
-                "date_range": f"{summary['first_date']} to {summary['last_date']}",
-                "average_loss_percentage": round(summary['avg_loss_pct'], 2)
-            }
+            "message": "Recalculation already running" if coalesced else "Loss recalculation started",
+            "job_id": job.id,
+            "coalesced": coalesced,
+            "status_url": f"/api/jobs/{job.id}"
         }
     except Exception as e:
         logger.error(f"❌ Recalculation error: {e}")
-        connection.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        connection.close()
 
 
 @router.get("/quality-report")
-async def quality_report():
+async def quality_report(request: Request):
     """
     Get data quality report showing potential issues
     """
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
+    def build_report():
+        with db_cursor() as (connection, cursor):
+            return get_data_quality_report(cursor)
+
+    async def load():
+        try:
+            report = await run_db(build_report)
+            return {
+                "success": True,
+                "report": report
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
 
-    try:
-        report = get_data_quality_report(cursor)
-        return {
-            "success": True,
-            "report": report
-        }
-    except Exception as e:
-        return {"success": False, "error": str(e)}
-    finally:
-        cursor.close()
-        connection.close()
+    return await cached_response(request, load)
 
 
 @router.get("/distributed-sessions")
 async def get_distributed_sessions(
         station_id: Optional[int] = None,
-        limit: int = 100
+        limit: int = 100,
+        format: Optional[str] = None,
+        accept: Optional[str] = Header(None)
 ):
     """
     View distributed session data (for debugging)
     Shows how session energy was distributed across intervals
+    Supports the same output formats as /api/losses
     """
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-
+    fmt = resolve_format(format, accept)
     query = """
         SELECT 
             ds.*,
@@ -152,11 +145,7 @@ async def get_distributed_sessions(
     params.append(limit)
 
     try:
-        cursor.execute(query, params)
-        data = cursor.fetchall()
-        return {"success": True, "data": data}
+        data = await fetch_all(query, params)
+        return format_response(data, fmt)
     except Exception as e:
-        return {"success": False, "error": str(e)}
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+        return {"success": False, "error": str(e)}
\ No newline at end of file
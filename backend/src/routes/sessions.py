@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from typing import Optional
-from backend.src.database import get_db_connection
+from backend.src.database import fetch_all, stream_query
+from backend.src.services.pagination import decode_cursor, keyset_condition, next_cursor, ndjson_response
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
@@ -9,14 +10,19 @@ async def get_sessions(
         station_id: Optional[int] = None,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        limit: int = 1000
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        stream: bool = False
 ):
-    """Get charging sessions with optional filters"""
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-
+    """
+    Get charging sessions with optional filters
+    Pages are ordered by (end_interval_15min, id) descending; pass next_cursor back as cursor for the next page.
+    With stream=true all matching rows (or up to limit) are sent as NDJSON while they are read.
+    """
     query = """
-        SELECT cs.*, s.station_code, s.station_name
+        SELECT cs.id, cs.station_id, cs.charger_name, cs.start_date, cs.end_date,
+               cs.total_kwh, cs.start_card, cs.end_interval_15min,
+               s.station_code, s.station_name
         FROM charging_sessions cs
         JOIN stations s ON cs.station_id = s.id
         WHERE 1=1
@@ -35,15 +41,29 @@ async def get_sessions(
         query += " AND cs.end_interval_15min <= %s"
         params.append(end_date)
 
-    query += " ORDER BY cs.end_interval_15min DESC LIMIT %s"
+    if cursor:
+        last_interval, last_id = decode_cursor(cursor)
+        query += keyset_condition("cs.end_interval_15min", "cs.id")
+        params.extend([last_interval, last_interval, last_id])
+
+    query += " ORDER BY cs.end_interval_15min DESC, cs.id DESC"
+
+    if stream:
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        return ndjson_response(stream_query(query, params))
+
+    limit = limit or 1000
+    query += " LIMIT %s"
     params.append(limit)
 
     try:
-        cursor.execute(query, params)
-        sessions = cursor.fetchall()
-        return {"success": True, "data": sessions}
+        sessions = await fetch_all(query, params)
+        return {
+            "success": True,
+            "data": sessions,
+            "next_cursor": next_cursor(sessions, limit, 'end_interval_15min')
+        }
     except Exception as e:
-        return {"success": False, "error": str(e)}
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+        return {"success": False, "error": str(e)}
\ No newline at end of file
@@ -1,38 +1,31 @@
-from fastapi import APIRouter
-from backend.src.database import get_db_connection
+from fastapi import APIRouter, Request
+from backend.src.database import fetch_all, fetch_one
+from backend.src.services.response_cache import cached_response
 
 router = APIRouter(prefix="/api/stations", tags=["stations"])
 
 @router.get("")
-async def get_stations():
+async def get_stations(request: Request):
     """Get all charging stations"""
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
+    async def load():
+        try:
+            stations = await fetch_all("SELECT * FROM stations ORDER BY station_code")
+            return {"success": True, "data": stations}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
 
-    try:
-        cursor.execute("SELECT * FROM stations ORDER BY station_code")
-        stations = cursor.fetchall()
-        return {"success": True, "data": stations}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
-    finally:
-        cursor.close()
-        connection.close()
+    return await cached_response(request, load)
 
 @router.get("/{station_id}")
-async def get_station(station_id: int):
+async def get_station(request: Request, station_id: int):
     """Get specific station details"""
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
+    async def load():
+        try:
+            station = await fetch_one("SELECT * FROM stations WHERE id = %s", (station_id,))
+            if not station:
+                return {"success": False, "error": "Station not found"}
+            return {"success": True, "data": station}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
 
-    try:
-        cursor.execute("SELECT * FROM stations WHERE id = %s", (station_id,))
-        station = cursor.fetchone()
-        if not station:
-            return {"success": False, "error": "Station not found"}
-        return {"success": True, "data": station}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+    return await cached_response(request, load)
\ No newline at end of file
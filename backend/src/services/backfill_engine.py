@@ -0,0 +1,235 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+from backend.src.config import settings
+from backend.src.database import db_cursor, run_db
+from backend.src.services.jasper_client import JasperClient
+from backend.src.services.proper_loss_calculator import ensure_loss_tables
+from backend.src.services.rate_limiter import RateLimiter
+from backend.src.services.rollups import rebuild_rollups_if_empty
+from backend.src.services.sync_service import SyncService, ensure_consumption_key
+
+logger = logging.getLogger(__name__)
+
+STEP = "PT15M"
+
+
+class BackfillEngine:
+    """
+    Parallel, resumable historical backfill.
+
+    The range is split into chunks of `chunk_days`; every (station, chunk) pair
+    is fetched concurrently under a shared rate limiter. Completed
+    (station, data point, chunk) triples are stored in backfill_checkpoints so
+    an interrupted run continues where it stopped.
+    """
+
+    def __init__(
+            self,
+            chunk_days: Optional[int] = None,
+            max_concurrent_chunks: Optional[int] = None,
+            requests_per_second: Optional[float] = None,
+            report_interval: Optional[float] = None
+    ):
+        config = settings.backfill_config
+        self.chunk_size = timedelta(days=chunk_days or config.get('chunk_days', 7))
+        self.max_concurrent_chunks = max_concurrent_chunks or config.get('max_concurrent_chunks', 4)
+        self.report_interval = report_interval or config.get('report_interval_seconds', 10)
+
+        rate = requests_per_second or config.get('requests_per_second', 5)
+        self.jasper_client = JasperClient(rate_limiter=RateLimiter(rate, burst=max(1, int(rate))))
+        self.sync_service = SyncService(jasper_client=self.jasper_client)
+
+        self._rows = 0
+        self._chunks_done = 0
+        self._chunks_total = 0
+        self._started_at = 0.0
+        self._last_report = 0.0
+        self._failed_chunks: List[Tuple[str, datetime, datetime]] = []
+
+    def build_chunks(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Split [start, end) into consecutive chunks of chunk_size"""
+        chunks = []
+        current = start
+        while current < end:
+            chunk_end = min(current + self.chunk_size, end)
+            chunks.append((current, chunk_end))
+            current = chunk_end
+        return chunks
+
+    def ensure_checkpoint_table(self, cursor, connection):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                station_id INT NOT NULL,
+                data_point_id VARCHAR(100) NOT NULL,
+                chunk_start DATETIME NOT NULL,
+                chunk_end DATETIME NOT NULL,
+                rows_fetched INT NOT NULL DEFAULT 0,
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (station_id, data_point_id, chunk_start, chunk_end),
+                FOREIGN KEY (station_id) REFERENCES stations(id)
+            )
+        """)
+        connection.commit()
+
+    def load_checkpoints(self, cursor, start: datetime, end: datetime) -> Set[Tuple]:
+        cursor.execute("""
+            SELECT station_id, data_point_id, chunk_start, chunk_end
+            FROM backfill_checkpoints
+            WHERE chunk_start >= %s AND chunk_end <= %s
+        """, (start, end))
+
+        return {
+            (row['station_id'], row['data_point_id'], row['chunk_start'], row['chunk_end'])
+            for row in cursor.fetchall()
+        }
+
+    def save_chunk(self, station_id: int, power_data: Dict[str, List], checkpoints: List[Tuple]) -> int:
+        """Upsert the chunk's consumption rows and mark its data points as completed"""
+        with db_cursor() as (connection, cursor):
+            records = 0
+            if power_data:
+                records = self.sync_service.process_and_insert_data(
+                    cursor, connection, station_id, power_data
+                )
+
+            if checkpoints:
+                cursor.executemany("""
+                    INSERT INTO backfill_checkpoints
+                    (station_id, data_point_id, chunk_start, chunk_end, rows_fetched)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        rows_fetched = VALUES(rows_fetched),
+                        completed_at = CURRENT_TIMESTAMP
+                """, checkpoints)
+                connection.commit()
+
+            return records
+
+    async def run(self, start: datetime, end: datetime) -> int:
+        """
+        Backfill all stations between start and end
+        Returns number of consumption records written
+        """
+        def prepare():
+            with db_cursor() as (connection, cursor):
+                # Same schema steps as the API startup: chunks mark loss partitions
+                # dirty and refresh the rollups, even before the API has ever started
+                ensure_loss_tables(cursor, connection)
+                ensure_consumption_key(cursor, connection)
+                rebuild_rollups_if_empty(cursor, connection)
+                self.ensure_checkpoint_table(cursor, connection)
+
+                cursor.execute("SELECT id, station_code FROM stations")
+                return cursor.fetchall(), self.load_checkpoints(cursor, start, end)
+
+        stations, completed = await run_db(prepare)
+
+        chunks = self.build_chunks(start, end)
+        work = []
+
+        for station in stations:
+            data_points = {
+                power_type: data_point_id
+                for power_type, data_point_id in settings.data_points.get(station['station_code'], {}).items()
+                if data_point_id and data_point_id.strip()
+            }
+            if not data_points:
+                logger.warning(f"No data points configured for station {station['station_code']}")
+                continue
+
+            for chunk_start, chunk_end in chunks:
+                # Values of all data points are summed per timestamp, so a chunk
+                # is only skipped when every data point of the station is done
+                if all((station['id'], dp, chunk_start, chunk_end) in completed for dp in data_points.values()):
+                    continue
+                work.append((station, data_points, chunk_start, chunk_end))
+
+        skipped = len(stations) * len(chunks) - len(work)
+        logger.info(f"Backfill {start} -> {end}: {len(work)} chunks to fetch, {skipped} already completed")
+
+        self._chunks_total = len(work)
+        self._started_at = time.monotonic()
+        self._last_report = self._started_at
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_chunks)
+
+        async def run_limited(item):
+            async with semaphore:
+                return await self._run_chunk(*item)
+
+        try:
+            await asyncio.gather(*[run_limited(item) for item in work])
+        finally:
+            await self.jasper_client.close()
+
+        self._report(force=True)
+        if self._failed_chunks:
+            logger.warning(
+                f"{len(self._failed_chunks)} chunks failed and were not checkpointed; "
+                f"run the backfill again to retry them"
+            )
+        return self._rows
+
+    async def _run_chunk(self, station: Dict, data_points: Dict[str, str], chunk_start: datetime, chunk_end: datetime):
+        station_id = station['id']
+        station_code = station['station_code']
+
+        try:
+            results = await asyncio.gather(*[
+                self.jasper_client.fetch_history(data_point_id, chunk_start, chunk_end, STEP)
+                for data_point_id in data_points.values()
+            ])
+
+            # Data point values are summed, so any failure stores nothing and
+            # leaves the whole chunk without a checkpoint for the next run
+            failed = [result for result in results if not result.ok]
+            if failed:
+                self._failed_chunks.append((station_code, chunk_start, chunk_end))
+                for result in failed:
+                    logger.error(
+                        f"Backfill fetch failed for {station_code}/{result.data_point_id} "
+                        f"({chunk_start} -> {chunk_end}) after {result.attempts} attempts: {result.error}"
+                    )
+                return
+
+            power_data = {
+                power_type: result.items
+                for power_type, result in zip(data_points.keys(), results)
+                if result.items
+            }
+
+            # Successful empty responses are checkpointed too: the window
+            # really has no data and would otherwise be fetched on every run
+            checkpoints = [
+                (station_id, data_point_id, chunk_start, chunk_end, len(result.items))
+                for data_point_id, result in zip(data_points.values(), results)
+            ]
+            records = await run_db(self.save_chunk, station_id, power_data, checkpoints)
+
+            self._rows += records
+            logger.debug(f"Backfilled {records} records for {station_code} ({chunk_start} -> {chunk_end})")
+
+        except Exception as e:
+            logger.error(f"Backfill error {station_code} ({chunk_start} -> {chunk_end}): {e}")
+
+        finally:
+            self._chunks_done += 1
+            self._report()
+
+    def _report(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_report < self.report_interval:
+            return
+
+        self._last_report = now
+        elapsed = max(now - self._started_at, 1e-6)
+        requests = self.jasper_client.request_count
+
+        logger.info(
+            f"Backfill progress: {self._chunks_done}/{self._chunks_total} chunks, "
+            f"{self._rows} rows, {self._rows / elapsed:.1f} rows/s, "
+            f"{requests / elapsed:.2f} requests/s, elapsed {elapsed:.0f}s"
+        )
@@ -0,0 +1,124 @@
+import csv
+import io
+import os
+import tempfile
+from itertools import islice
+from typing import Iterable, List, Optional, Sequence
+import logging
+from mysql.connector import Error
+from backend.src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _batches(rows: Iterable[Sequence], batch_size: int):
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(
+        cursor,
+        connection,
+        table: str,
+        columns: List[str],
+        rows: Iterable[Sequence],
+        update_columns: Optional[List[str]] = None,
+        batch_size: Optional[int] = None,
+        commit: bool = True
+) -> int:
+    """
+    Insert rows with chunked multi-row INSERT statements
+    Rows may be any iterable (e.g. a generator) and are consumed one chunk at a time;
+    with commit=True every chunk is committed so memory and undo log stay flat.
+    update_columns turns the statement into an upsert (ON DUPLICATE KEY UPDATE).
+    Returns number of rows sent
+    """
+    batch_size = batch_size or settings.bulk_load_config.get('batch_size', 5000)
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    suffix = ""
+    if update_columns:
+        suffix = " ON DUPLICATE KEY UPDATE " + ", ".join(
+            f"{column} = VALUES({column})" for column in update_columns
+        )
+
+    total = 0
+    for batch in _batches(rows, batch_size):
+        params = [value for row in batch for value in row]
+        cursor.execute(prefix + ", ".join([row_placeholder] * len(batch)) + suffix, params)
+        if commit:
+            connection.commit()
+        total += len(batch)
+
+    return total
+
+
+def _csv_value(value):
+    # With an empty ESCAPED BY, LOAD DATA reads an unquoted NULL as SQL NULL
+    if value is None:
+        return "NULL"
+    return value
+
+
+def _load_data_chunk(cursor, connection, table: str, columns: List[str], batch: List[Sequence]) -> int:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([_csv_value(value) for value in row] for row in batch)
+
+    # mysql.connector only streams LOCAL INFILE data from a path
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as f:
+        f.write(buffer.getvalue())
+        path = f.name
+
+    try:
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE %s
+            INTO TABLE {table}
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+            LINES TERMINATED BY '\\n'
+            ({', '.join(columns)})
+        """, (path,))
+        connection.commit()
+    finally:
+        os.unlink(path)
+
+    return len(batch)
+
+
+def bulk_load(
+        cursor,
+        connection,
+        table: str,
+        columns: List[str],
+        rows: Iterable[Sequence],
+        batch_size: Optional[int] = None
+) -> int:
+    """
+    Append rows to a table chunk by chunk using the fastest enabled path
+    LOAD DATA LOCAL INFILE when bulk_load.use_load_data is set, otherwise
+    (or if the server refuses the first chunk) multi-row INSERTs
+    Returns number of rows loaded
+    """
+    batch_size = batch_size or settings.bulk_load_config.get('batch_size', 5000)
+    use_load_data = settings.bulk_load_config.get('use_load_data', False)
+
+    total = 0
+    for batch in _batches(rows, batch_size):
+        if use_load_data:
+            try:
+                total += _load_data_chunk(cursor, connection, table, columns, batch)
+                continue
+            except Error as e:
+                if total:
+                    raise
+                logger.warning(f"LOAD DATA LOCAL INFILE into {table} failed, using INSERT instead: {e}")
+                connection.rollback()
+                use_load_data = False
+
+        total += bulk_insert(cursor, connection, table, columns, batch, batch_size=batch_size)
+
+    return total
@@ -1,67 +1,232 @@
+import hashlib
+import re
 import pandas as pd
 import logging
-from backend.src.database import get_db_connection
+from backend.src.config import settings
+from backend.src.database import db_cursor
+from backend.src.services.bulk_loader import bulk_insert
+from backend.src.services.proper_loss_calculator import mark_partitions_dirty, mark_session_range_dirty, session_partitions, session_range_end
+from backend.src.services.response_cache import bump_data_version
 
 logger = logging.getLogger(__name__)
 
-def process_sessions_csv(file_path):
+SESSION_COLUMNS = ['station_id', 'charger_name', 'start_date', 'end_date', 'total_kwh', 'start_card', 'end_interval_15min']
+
+# Původní import nechal pandas odvodit typ sloupce, číselné karty s prázdnými
+# hodnotami se tak uložily jako float ('12345.0')
+FLOAT_CARD = re.compile(r'^(\d+)\.0$')
+
+
+def normalize_card(card):
+    """Číslo karty bez '.0' z odvození typu; None zůstává None"""
+    if card is None:
+        return None
+    return FLOAT_CARD.sub(r'\1', str(card).strip())
+
+
+def _nullable(series):
+    # NaN/NaT -> None, aby je konektor uložil jako NULL
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def prepare_session_chunk(df, stations_dict):
     """
-    Nahraje pouze nabíjecí relace (Sessions) z CSV souboru.
+    Převede jeden chunk CSV na záznamy pro charging_sessions (vektorově, bez iterrows)
+    Vrací seznam tuple ve stejném pořadí jako SESSION_COLUMNS
     """
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
+    # Převod datumů
+    df['Start Date'] = pd.to_datetime(df['Start Date'], errors='coerce')
+    df['End Date'] = pd.to_datetime(df['End Date'], errors='coerce')
+    df = df.dropna(subset=['End Date', 'Total kWh', 'Charger'])
 
-    try:
-        # Načtení stanic pro mapování station_id
-        cursor.execute("SELECT id, station_code FROM stations")
-        stations_dict = {s['station_code']: s['id'] for s in cursor.fetchall()}
+    # Extrakce kódu stanice (např. UR371) z názvu chargeru a mapování na station_id
+    charger = df['Charger'].astype(str)
+    station_ids = charger.str.split(',', n=1).str[0].str.strip().map(stations_dict)
+    known = station_ids.notna()
+    df, charger, station_ids = df[known], charger[known], station_ids[known]
 
-        # Načtení CSV (očekáváme středník a čárku jako desetinný oddělovač)
-        df = pd.read_csv(file_path, sep=';', decimal=',')
+    if df.empty:
+        return []
 
-        # Převod datumů
-        df['Start Date'] = pd.to_datetime(df['Start Date'], errors='coerce')
-        df['End Date'] = pd.to_datetime(df['End Date'], errors='coerce')
-        df = df.dropna(subset=['End Date', 'Total kWh', 'Charger'])
+    if 'Start Card' in df.columns:
+        cards = df['Start Card']
+        start_card = cards.astype(str).str.strip().str.replace(FLOAT_CARD, r'\1', regex=True).where(cards.notna())
+    else:
+        start_card = pd.Series('', index=df.index)
 
-        # Extrakce kódu stanice (např. UR371) z názvu chargeru
-        df['Charger_Code'] = df['Charger'].apply(lambda x: str(x).split(',')[0].strip())
+    return list(zip(
+        station_ids.astype(int).tolist(),
+        charger.tolist(),
+        _nullable(df['Start Date']),
+        _nullable(df['End Date']),
+        # Zaokrouhleno na přesnost sloupce, aby content_hash odpovídal uložené hodnotě
+        df['Total kWh'].astype(float).round(3).tolist(),
+        _nullable(start_card),
         # Pomocný sloupec pro zaokrouhlený čas konce (pro párování se spotřebou)
-        df['End_Interval_15min'] = df['End Date'].dt.floor('15min')
-
-        session_records = []
-        for _, row in df.iterrows():
-            code = row['Charger_Code']
-            if code in stations_dict:
-                session_records.append((
-                    stations_dict[code],
-                    row['Charger'],
-                    row['Start Date'],
-                    row['End Date'],
-                    row['Total kWh'],
-                    row.get('Start Card', ''),
-                    row['End_Interval_15min']
-                ))
-
-        if session_records:
-            # Smažeme staré sessions, pokud chceme čistý import,
-            # nebo použijeme ON DUPLICATE KEY UPDATE (pokud máš unikátní ID relace)
-            cursor.execute("DELETE FROM charging_sessions")
-
-            sql = """
-                INSERT INTO charging_sessions 
-                (station_id, charger_name, start_date, end_date, total_kwh, start_card, end_interval_15min)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.executemany(sql, session_records)
-            connection.commit()
-            logger.info(f"Úspěšně nahráno {len(session_records)} relací z CSV.")
-            return len(session_records)
-
-    except Exception as e:
-        logger.error(f"Chyba při zpracování Sessions CSV: {e}")
+        _nullable(df['End Date'].dt.floor('15min'))
+    ))
+
+
+def session_key(record):
+    """Přirozený klíč relace: stanice, charger, začátek (nebo konec) a karta"""
+    station_id, charger_name, start_date, end_date, _, start_card, _ = record
+    start = start_date if start_date is not None else end_date
+    return hashlib.sha1(
+        f"{station_id}|{charger_name}|{start:%Y-%m-%d %H:%M:%S}|{normalize_card(start_card) or ''}".encode()
+    ).hexdigest()
+
+
+def content_hash(record):
+    """Hash měnitelného obsahu relace (konec a energie)"""
+    _, _, _, end_date, total_kwh, _, _ = record
+    return hashlib.sha1(f"{end_date:%Y-%m-%d %H:%M:%S}|{total_kwh:.3f}".encode()).hexdigest()
+
+
+def backfill_session_keys(cursor, table='charging_sessions'):
+    """
+    Dopočítá klíče řádků bez session_key v SQL, stejně jako funkce session_key a content_hash,
+    včetně normalizace karet uložených původním importem jako '12345.0'
+    """
+    cursor.execute(f"""
+        UPDATE {table}
+        SET start_card = LEFT(TRIM(start_card), CHAR_LENGTH(TRIM(start_card)) - 2)
+        WHERE session_key IS NULL AND TRIM(start_card) REGEXP '^[0-9]+[.]0$'
+    """)
+    cursor.execute(f"""
+        UPDATE {table}
+        SET session_key = SHA1(CONCAT_WS('|', station_id, charger_name,
+                                         COALESCE(start_date, end_date), TRIM(COALESCE(start_card, '')))),
+            content_hash = SHA1(CONCAT_WS('|', end_date, total_kwh))
+        WHERE session_key IS NULL
+    """)
+
+
+def ensure_session_keys(cursor, connection):
+    """
+    Doplní sloupce session_key/content_hash a unikátní klíč do starších tabulek
+    Klíče existujících řádků dopočítá backfill_session_keys
+    """
+    cursor.execute("SHOW COLUMNS FROM charging_sessions LIKE 'session_key'")
+    if cursor.fetchall():
+        return
+
+    cursor.execute("""
+        ALTER TABLE charging_sessions
+        ADD COLUMN session_key CHAR(40) NULL,
+        ADD COLUMN content_hash CHAR(40) NULL
+    """)
+    backfill_session_keys(cursor)
+
+    cursor.execute("""
+        SELECT session_key FROM charging_sessions
+        GROUP BY session_key HAVING COUNT(*) > 1
+        LIMIT 1
+    """)
+    if cursor.fetchone():
         connection.rollback()
-        raise e
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+        raise Exception("charging_sessions obsahuje duplicitní relace, unikátní klíč nelze vytvořit")
+
+    cursor.execute("ALTER TABLE charging_sessions ADD UNIQUE KEY unique_session_key (session_key)")
+    connection.commit()
+
+
+def load_existing_sessions(cursor, keys, batch_size=1000):
+    """session_key -> uložená relace (content_hash, station_id, start_date, end_date)"""
+    existing = {}
+    for offset in range(0, len(keys), batch_size):
+        batch = keys[offset:offset + batch_size]
+        placeholders = ','.join(['%s'] * len(batch))
+        cursor.execute(f"""
+            SELECT session_key, content_hash, station_id, start_date, end_date
+            FROM charging_sessions
+            WHERE session_key IN ({placeholders})
+        """, batch)
+        existing.update((row['session_key'], row) for row in cursor.fetchall())
+    return existing
+
+
+def process_sessions_csv(file_path, chunk_size=None):
+    """
+    Nahraje nabíjecí relace (Sessions) z CSV souboru jako delta import.
+    Relace se párují podle přirozeného klíče; vloží se jen nové a změněné
+    (podle content_hash), ostatní zůstanou beze změny i s rozpočítanou energií.
+    Soubor se čte po chuncích, každý chunk se commitne zvlášť (import je idempotentní).
+    Vrací množinu dotčených (station_id, date) partitions.
+    """
+    chunk_size = chunk_size or settings.bulk_load_config.get('csv_chunk_size', 50000)
+
+    with db_cursor() as (connection, cursor):
+        try:
+            ensure_session_keys(cursor, connection)
+
+            # Načtení stanic pro mapování station_id
+            cursor.execute("SELECT id, station_code FROM stations")
+            stations_dict = {s['station_code']: s['id'] for s in cursor.fetchall()}
+
+            counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+            partitions = set()
+            range_end = session_range_end(cursor)
+
+            # Načtení CSV (očekáváme středník a čárku jako desetinný oddělovač)
+            for chunk in pd.read_csv(file_path, sep=';', decimal=',', dtype={'Start Card': str}, chunksize=chunk_size):
+                # Duplicitní řádky v souboru: platí poslední výskyt
+                keyed = {session_key(record): record for record in prepare_session_chunk(chunk, stations_dict)}
+                if not keyed:
+                    continue
+
+                existing = load_existing_sessions(cursor, list(keyed))
+                changed_records = []
+                chunk_partitions = set()
+
+                for key, record in keyed.items():
+                    digest = content_hash(record)
+                    stored = existing.get(key)
+
+                    if stored and stored['content_hash'] == digest:
+                        counts['unchanged'] += 1
+                        continue
+
+                    if stored:
+                        # Původní rozsah relace se musí přepočítat také
+                        counts['updated'] += 1
+                        chunk_partitions |= session_partitions(
+                            stored['station_id'], stored['start_date'] or stored['end_date'], stored['end_date']
+                        )
+                    else:
+                        counts['inserted'] += 1
+
+                    station_id, _, start_date, end_date, *_ = record
+                    chunk_partitions |= session_partitions(station_id, start_date or end_date, end_date)
+                    changed_records.append(record + (key, digest))
+
+                if changed_records:
+                    bulk_insert(
+                        cursor, connection, 'charging_sessions',
+                        SESSION_COLUMNS + ['session_key', 'content_hash'],
+                        changed_records,
+                        update_columns=['end_date', 'total_kwh', 'end_interval_15min', 'content_hash'],
+                        commit=False
+                    )
+                    # Dny dotčené relacemi se při inkrementálním přepočtu ztrát přepočítají
+                    mark_partitions_dirty(cursor, chunk_partitions)
+                    # Dny se spotřebou, které se novými relacemi dostaly do rozsahu výpočtu ztrát
+                    new_range_end = session_range_end(cursor)
+                    mark_session_range_dirty(cursor, range_end, new_range_end)
+                    range_end = new_range_end
+                    connection.commit()
+                    partitions |= chunk_partitions
+
+                logger.info(
+                    f"Zpracováno relací: {counts['inserted']} nových, "
+                    f"{counts['updated']} změněných, {counts['unchanged']} beze změny"
+                )
+
+            if partitions:
+                bump_data_version()
+            logger.info(f"Import relací z CSV dokončen, dotčeno {len(partitions)} dnů stanic.")
+            return partitions
+
+        except Exception as e:
+            logger.error(f"Chyba při zpracování Sessions CSV: {e}")
+            connection.rollback()
+            raise e
\ No newline at end of file
@@ -0,0 +1,41 @@
+from typing import List, Sequence
+
+
+def lttb(values: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets downsampling
+    values are y-values at evenly spaced x positions (time buckets).
+    Returns sorted indices of the points to keep; first and last are always kept.
+    """
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    selected = [0]
+    bucket_size = (count - 2) / (threshold - 2)
+    previous = 0
+
+    for i in range(threshold - 2):
+        bucket_start = int(i * bucket_size) + 1
+        bucket_end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third corner of the triangle
+        next_start = bucket_end
+        next_end = min(int((i + 2) * bucket_size) + 1, count)
+        next_x = (next_start + next_end - 1) / 2
+        next_y = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        best_index, best_area = bucket_start, -1.0
+        for j in range(bucket_start, bucket_end):
+            area = abs(
+                (previous - next_x) * (values[j] - values[previous])
+                - (previous - j) * (next_y - values[previous])
+            )
+            if area > best_area:
+                best_index, best_area = j, area
+
+        selected.append(best_index)
+        previous = best_index
+
+    selected.append(count - 1)
+    return selected
\ No newline at end of file
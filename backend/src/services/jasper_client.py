@@ -1,13 +1,124 @@
+import asyncio
+import random
+import time
 import httpx
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from typing import Dict, List, Optional, Any
 from backend.src.config import settings
+from backend.src.services.rate_limiter import RateLimiter
+from backend.src.services.circuit_breaker import CircuitBreaker
+from backend.src.services.metrics import (
+    JASPER_REQUEST_SECONDS, JASPER_ROWS_FETCHED, JASPER_RETRIES, JASPER_FAILURES
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Statuses worth retrying; anything else in 4xx is a problem with the request itself
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class JasperFetchError(Exception):
+    """A history window could not be fetched; carries what is needed to requeue it"""
+
+    def __init__(self, data_point_id: str, start: datetime, end: datetime, reason: str, status: Optional[int] = None):
+        self.data_point_id = data_point_id
+        self.start = start
+        self.end = end
+        self.reason = reason
+        self.status = status
+        super().__init__(f"{data_point_id} ({start} -> {end}): {reason}")
+
+
+class HistoryResult:
+    """Outcome of one history request: the items, or why there are none"""
+
+    def __init__(self, data_point_id: str, start: datetime, end: datetime):
+        self.data_point_id = data_point_id
+        self.start = start
+        self.end = end
+        self.items = []
+        self.ok = False
+        self.status = None
+        self.error = None
+        self.attempts = 0
+
+    def raise_for_error(self):
+        if not self.ok:
+            raise JasperFetchError(self.data_point_id, self.start, self.end, self.error, self.status)
+
+
+# Shared by every JasperClient in the process, so concurrent syncs and
+# backfills see the same limits and the same open circuits
+_shared_rate_limiter = None
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_shared_rate_limiter() -> RateLimiter:
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        rate = settings.jasper_resilience_config.get('requests_per_second', 10)
+        _shared_rate_limiter = RateLimiter(rate, burst=max(1, int(rate)))
+    return _shared_rate_limiter
+
+
+def get_breaker(data_point_id: str) -> CircuitBreaker:
+    if data_point_id not in _breakers:
+        resilience = settings.jasper_resilience_config
+        _breakers[data_point_id] = CircuitBreaker(
+            failure_threshold=resilience.get('circuit_failure_threshold', 5),
+            reset_timeout=resilience.get('circuit_reset_seconds', 300)
+        )
+    return _breakers[data_point_id]
+
+
+def parse_timestamp(ts: str) -> datetime:
+    return datetime.fromisoformat(ts.replace('Z', '+00:00'))
+
+
+def split_window(start: datetime, end: datetime, max_window: timedelta) -> List[tuple]:
+    """Split [start, end) into consecutive windows of at most max_window"""
+    windows = []
+    current = start
+    while current < end:
+        window_end = min(current + max_window, end)
+        windows.append((current, window_end))
+        current = window_end
+    return windows or [(start, end)]
+
+
+def stitch_histories(histories: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge sub-window histories into one list in timestamp order
+    Adjacent windows share their boundary sample; the later copy wins
+    """
+    by_time = {}
+    for items in histories:
+        for item in items:
+            by_time[parse_timestamp(item['timeStamp'])] = item
+    return [by_time[ts] for ts in sorted(by_time)]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as delta-seconds or an HTTP date; None when absent or unparsable"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
 class JasperClient:
-    def __init__(self):
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None):
         self.base_url = settings.jasper_config["base_url"]
         self.api_key = settings.jasper_config["api_key"]
         self.domain_id = settings.jasper_config["domain_id"]
@@ -21,29 +132,92 @@ class JasperClient:
             "x-domainid": self.domain_id,
             "Content-Type": "application/json"
         }
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # Every request of every station shares one connection pool; the
+        # semaphore caps how many of them are in flight at the same time.
+        self.client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(
+                max_connections=settings.jasper_max_connections,
+                max_keepalive_connections=settings.jasper_max_keepalive_connections
+            )
+        )
+        self._in_flight = asyncio.Semaphore(settings.jasper_max_in_flight)
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        self.request_count = 0
+
+        resilience = settings.jasper_resilience_config
+        self.max_retries = resilience.get('max_retries', 4)
+        self.backoff_base = resilience.get('backoff_base_seconds', 1)
+        self.backoff_max = resilience.get('backoff_max_seconds', 60)
+        self.max_window = timedelta(days=settings.jasper_max_window_days)
 
     async def close(self):
         await self.client.aclose()
 
-    async def get_historical_data(
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter: spreads retries of many data points failing together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def fetch_history(
             self,
             data_point_id: str,
             start_time: datetime,
             end_time: datetime,
             step: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
+    ) -> HistoryResult:
         """
-        Fetch historical data from Jasper API
-        Endpoint: /api/public/datapoints/{id}/history/retrieve
+        Fetch historical data from Jasper API with retries
+        Ranges longer than max_window_days are split into sub-windows that are
+        fetched concurrently and stitched back in timestamp order
+        Never raises; failures are reported in the returned HistoryResult
         """
-        url = f"{self.base_url}/{data_point_id}/history/retrieve"
-
         if start_time.tzinfo is None:
             start_time = start_time.replace(tzinfo=timezone.utc)
         if end_time.tzinfo is None:
             end_time = end_time.replace(tzinfo=timezone.utc)
 
+        windows = split_window(start_time, end_time, self.max_window)
+        if len(windows) == 1:
+            return await self._fetch_window(data_point_id, start_time, end_time, step)
+
+        logger.debug(f"Splitting {data_point_id} ({start_time} -> {end_time}) into {len(windows)} windows")
+        parts = await asyncio.gather(*[
+            self._fetch_window(data_point_id, window_start, window_end, step)
+            for window_start, window_end in windows
+        ])
+
+        result = HistoryResult(data_point_id, start_time, end_time)
+        result.attempts = sum(part.attempts for part in parts)
+        failed = [part for part in parts if not part.ok]
+        if failed:
+            # All or nothing: a stitched history with a hole would be stored as complete
+            result.status = failed[0].status
+            result.error = (
+                f"{len(failed)}/{len(parts)} windows failed, first "
+                f"{failed[0].start} -> {failed[0].end}: {failed[0].error}"
+            )
+            return result
+
+        result.items = stitch_histories([part.items for part in parts])
+        result.status = parts[-1].status
+        result.ok = True
+        return result
+
+    async def _fetch_window(
+            self,
+            data_point_id: str,
+            start_time: datetime,
+            end_time: datetime,
+            step: Optional[str] = None
+    ) -> HistoryResult:
+        """
+        One history request with retries
+        Endpoint: /api/public/datapoints/{id}/history/retrieve
+        """
+        url = f"{self.base_url}/{data_point_id}/history/retrieve"
+
         payload = {
             "start": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
             "end": end_time.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -52,28 +226,83 @@ class JasperClient:
         if step:
             payload["step"] = step
 
-        try:
-            response = await self.client.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
-            data = response.json()
-
-            if isinstance(data, dict) and "historyValues" in data:
-                history_values = data["historyValues"]
-                logger.debug(f"Retrieved {len(history_values)} records for {data_point_id}")
-                return history_values
-            elif isinstance(data, list):
-                logger.debug(f"Retrieved {len(data)} records for {data_point_id}")
-                return data
-            else:
-                logger.warning(f"Unexpected response format for {data_point_id}: {type(data)}")
-                return []
-
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error for {data_point_id}: {e.response.status_code} - {e.response.text}")
-            return []
-        except Exception as e:
-            logger.error(f"Error fetching history for {data_point_id}: {e}")
-            return []
+        result = HistoryResult(data_point_id, start_time, end_time)
+        breaker = get_breaker(data_point_id)
+
+        while True:
+            if not breaker.allow():
+                result.error = "circuit open"
+                JASPER_FAILURES.labels(data_point_id, "circuit_open").inc()
+                return result
+
+            result.attempts += 1
+            retry_after = None
+            retryable = False
+
+            try:
+                await self.rate_limiter.acquire()
+
+                async with self._in_flight:
+                    self.request_count += 1
+                    started = time.perf_counter()
+                    outcome = "error"
+                    try:
+                        response = await self.client.post(url, json=payload, headers=self.headers)
+                        outcome = str(response.status_code)
+                    finally:
+                        JASPER_REQUEST_SECONDS.labels(data_point_id, outcome).observe(time.perf_counter() - started)
+
+                result.status = response.status_code
+                if response.status_code in RETRYABLE_STATUSES:
+                    retryable = True
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    result.error = f"HTTP {response.status_code}"
+                else:
+                    response.raise_for_status()
+                    data = response.json()
+
+                    if isinstance(data, dict) and "historyValues" in data:
+                        result.items = data["historyValues"]
+                    elif isinstance(data, list):
+                        result.items = data
+                    else:
+                        raise ValueError(f"Unexpected response format: {type(data)}")
+
+                    result.ok = True
+                    result.error = None
+                    breaker.record_success()
+                    logger.debug(f"Retrieved {len(result.items)} records for {data_point_id}")
+                    return result
+
+            except httpx.HTTPStatusError as e:
+                result.error = f"HTTP {e.response.status_code}: {e.response.text[:200]}"
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                retryable = True
+                result.error = f"{type(e).__name__}: {e}"
+            except Exception as e:
+                result.error = str(e)
+
+            if not retryable:
+                # The API answered; the request itself is wrong, so the circuit stays as is
+                breaker.release()
+                logger.error(f"History request failed for {data_point_id}: {result.error}")
+                JASPER_FAILURES.labels(data_point_id, "rejected").inc()
+                return result
+
+            breaker.record_failure()
+            if result.attempts > self.max_retries:
+                logger.error(
+                    f"Giving up on {data_point_id} after {result.attempts} attempts: {result.error}"
+                )
+                JASPER_FAILURES.labels(data_point_id, "retries_exhausted").inc()
+                return result
+
+            delay = self._backoff(result.attempts - 1, retry_after)
+            logger.warning(
+                f"Retrying {data_point_id} in {delay:.1f}s (attempt {result.attempts}): {result.error}"
+            )
+            JASPER_RETRIES.labels(data_point_id).inc()
+            await asyncio.sleep(delay)
 
     async def get_station_power_data(
             self,
@@ -83,7 +312,10 @@ class JasperClient:
     ) -> Dict[str, List[Dict]]:
         """
         Fetch power data for a specific station
+        All data points are requested concurrently (bounded by max_in_flight_requests)
         Returns dict with power_type -> list of history items
+        Raises JasperFetchError if any data point failed: values are summed
+        across data points, so a partial result would store wrong totals
         """
         station_data_points = settings.data_points.get(station_code, {})
 
@@ -94,12 +326,25 @@ class JasperClient:
         results = {}
         step = "PT15M"
 
-        for power_type, data_point_id in station_data_points.items():
-            if data_point_id and data_point_id.strip():
-                history = await self.get_historical_data(data_point_id, start_time, end_time, step)
+        requested = [
+            (power_type, data_point_id)
+            for power_type, data_point_id in station_data_points.items()
+            if data_point_id and data_point_id.strip()
+        ]
+
+        histories = await asyncio.gather(*[
+            self.fetch_history(data_point_id, start_time, end_time, step)
+            for _, data_point_id in requested
+        ])
+
+        for history in histories:
+            history.raise_for_error()
+
+        for (power_type, _), history in zip(requested, histories):
+            if history.items:
+                results[power_type] = history.items
+                logger.debug(f"Retrieved {len(history.items)} records for {station_code}.{power_type}")
 
-                if history:
-                    results[power_type] = history
-                    logger.debug(f"Retrieved {len(history)} records for {station_code}.{power_type}")
+        JASPER_ROWS_FETCHED.labels(station_code).observe(sum(len(history) for history in results.values()))
 
         return results
\ No newline at end of file
@@ -0,0 +1,221 @@
+import logging
+import multiprocessing
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from backend.src.config import settings
+from backend.src.database import db_cursor
+from backend.src.services.proper_loss_calculator import recalculate_everything, recalculate_incremental
+from backend.src.services.parallel_recalculation import init_worker_logging, recalculate_parallel
+from backend.src.services.response_cache import bump_data_version
+from backend.src.services.metrics import RECALCULATION_STEP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+RECALCULATE = "recalculate"
+RECALCULATE_INCREMENTAL = "recalculate_incremental"
+RECALCULATION_KINDS = (RECALCULATE, RECALCULATE_INCREMENTAL)
+
+# A request of the key kind is already covered by an active job of these kinds
+COALESCES_WITH = {
+    RECALCULATE: (RECALCULATE,),
+    RECALCULATE_INCREMENTAL: (RECALCULATE, RECALCULATE_INCREMENTAL),
+}
+
+
+def run_recalculation(incremental: bool, state) -> dict:
+    """
+    Worker process entry point for loss recalculation
+    state is a Manager dict shared with the API process and receives step and counters
+    """
+    step_started = {}
+
+    def progress(step, **counters):
+        update = dict(counters, step=step)
+        previous = state.get('step')
+        if previous != step:
+            now = time.monotonic()
+            update['step_started_at'] = datetime.utcnow().isoformat()
+            # Durations of finished steps, observed as metrics by the API process
+            if previous in step_started:
+                update['step_seconds'] = {
+                    **state.get('step_seconds', {}),
+                    previous: round(now - step_started[previous], 3)
+                }
+            step_started[step] = now
+        state.update(update)
+
+    state['started_at'] = datetime.utcnow().isoformat()
+    workers = settings.recalculation_config.get('workers', 1)
+
+    with db_cursor() as (connection, cursor):
+        if incremental:
+            summary = recalculate_incremental(cursor, connection, progress)
+        elif workers > 1:
+            summary = recalculate_parallel(cursor, connection, workers, progress)
+        else:
+            summary = recalculate_everything(cursor, connection, progress)
+
+        cursor.execute("""
+            SELECT 
+                COUNT(*) as total_records,
+                MIN(period_start) as first_date,
+                MAX(period_end) as last_date,
+                AVG(loss_percentage) as avg_loss_pct
+            FROM loss_analysis
+        """)
+        totals = cursor.fetchone()
+
+    progress("done")
+    return {
+        **summary,
+        "total_records": totals['total_records'],
+        "date_range": f"{totals['first_date']} to {totals['last_date']}",
+        "average_loss_percentage": round(float(totals['avg_loss_pct'] or 0), 2)
+    }
+
+
+class Job:
+    def __init__(self, kind: str, params: dict, state):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.state = state
+        self.status = "queued"
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_dict(self) -> dict:
+        try:
+            progress = dict(self.state)
+        except Exception:
+            # Manager already shut down
+            progress = {}
+
+        status = self.status
+        if status == "queued" and 'started_at' in progress:
+            status = "running"
+
+        started_at = progress.pop('started_at', None)
+        duration = None
+        if started_at:
+            end = self.finished_at or datetime.utcnow()
+            duration = round((end - datetime.fromisoformat(started_at)).total_seconds(), 1)
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": status,
+            "step": progress.pop('step', None),
+            "progress": progress,
+            "created_at": self.created_at.isoformat(),
+            "started_at": started_at,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_seconds": duration,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class JobManager:
+    """
+    Runs long jobs in a spawned worker process pool and tracks their status
+
+    Progress is written by the worker into a Manager dict owned by the job,
+    so GET /api/jobs/{id} can report it while the job runs. Requests that an
+    active job already covers are coalesced into that job.
+    """
+
+    def __init__(self, workers=1, history_size=100):
+        self.workers = workers
+        self.history_size = history_size
+        self._executor = None
+        self._manager = None
+        self._jobs = OrderedDict()
+
+    def _ensure_started(self):
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=init_worker_logging
+            )
+
+    def active_job(self, kinds: Iterable[str] = RECALCULATION_KINDS) -> Optional[Job]:
+        for job in self._jobs.values():
+            if job.active and job.kind in kinds:
+                return job
+        return None
+
+    def submit_recalculation(self, incremental: bool = False) -> Tuple[Job, bool]:
+        """Start a recalculation job, or return the active one covering it; returns (job, coalesced)"""
+        kind = RECALCULATE_INCREMENTAL if incremental else RECALCULATE
+
+        existing = self.active_job(COALESCES_WITH[kind])
+        if existing:
+            return existing, True
+
+        self._ensure_started()
+        job = Job(kind, {"incremental": incremental}, self._manager.dict())
+        future = self._executor.submit(run_recalculation, incremental, job.state)
+        future.add_done_callback(lambda f: self._finish(job, f))
+
+        self._jobs[job.id] = job
+        self._trim()
+        logger.info(f"🧵 Job {job.id} ({kind}) submitted")
+        return job, False
+
+    def _finish(self, job: Job, future):
+        job.finished_at = datetime.utcnow()
+        error = future.exception()
+        if error:
+            job.status = "failed"
+            job.error = str(error)
+            logger.error(f"❌ Job {job.id} ({job.kind}) failed: {error}")
+        else:
+            job.status = "succeeded"
+            job.result = future.result()
+            logger.info(f"✅ Job {job.id} ({job.kind}) finished")
+
+            for step, seconds in job.state.get('step_seconds', {}).items():
+                RECALCULATION_STEP_SECONDS.labels(step).observe(seconds)
+        # The worker wrote in another process; drop responses cached here
+        bump_data_version()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def list(self) -> List[dict]:
+        return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._executor = None
+            self._manager = None
+
+
+jobs_config = settings.jobs_config
+job_manager = JobManager(
+    workers=jobs_config.get('workers', 1),
+    history_size=jobs_config.get('history_size', 100)
+)
\ No newline at end of file
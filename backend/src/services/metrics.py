@@ -0,0 +1,114 @@
+from contextvars import ContextVar
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.routing import Match
+
+# Route template of the request being served; background work keeps the default
+current_route: ContextVar[str] = ContextVar("current_route", default="background")
+
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+JASPER_REQUEST_SECONDS = Histogram(
+    "jasper_request_seconds",
+    "Latency of Jasper history requests",
+    ["data_point", "outcome"]
+)
+JASPER_RETRIES = Counter(
+    "jasper_request_retries_total",
+    "Jasper history requests retried after a retryable failure",
+    ["data_point"]
+)
+JASPER_FAILURES = Counter(
+    "jasper_fetch_failures_total",
+    "Jasper history fetches given up, by reason",
+    ["data_point", "reason"]
+)
+JASPER_ROWS_FETCHED = Histogram(
+    "jasper_rows_fetched",
+    "History items fetched per station fetch",
+    ["station"],
+    buckets=ROW_BUCKETS
+)
+ROWS_UPSERTED = Histogram(
+    "power_rows_upserted",
+    "power_consumption rows upserted per station batch",
+    ["station"],
+    buckets=ROW_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds",
+    "Time spent in blocking DB calls, by HTTP route",
+    ["route"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "HTTP request duration by route",
+    ["route", "method"]
+)
+SCHEDULER_LAG_SECONDS = Histogram(
+    "scheduler_tick_lag_seconds",
+    "Delay between the aligned scheduler tick and the start of its sync",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+)
+SYNC_SECONDS = Histogram(
+    "sync_run_seconds",
+    "Duration of sync runs including the post-sync loss stage",
+    ["trigger"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+SYNC_COALESCED = Counter(
+    "sync_coalesced_triggers_total",
+    "Sync triggers that joined an already running sync"
+)
+RECALCULATION_STEP_SECONDS = Histogram(
+    "recalculation_step_seconds",
+    "Duration of loss recalculation steps",
+    ["step"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database pool connections by state",
+    ["state"]
+)
+RESPONSE_CACHE_ENTRIES = Gauge("response_cache_entries", "Cached responses")
+RESPONSE_CACHE_BYTES = Gauge("response_cache_bytes", "Size of cached response bodies")
+
+
+def resolve_route(scope) -> str:
+    """Route template (e.g. /api/stations/{station_id}) matching an ASGI scope"""
+    app = scope.get("app")
+    for route in getattr(app, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class RouteMetricsMiddleware:
+    """ASGI middleware: tags the request context with its route and times the request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = resolve_route(scope)
+        token = current_route.set(route)
+        with HTTP_REQUEST_SECONDS.labels(route, scope["method"]).time():
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                current_route.reset(token)
+
+
+def render(pool_stats: dict, cache_stats: dict):
+    """Refresh sampled gauges and render all metrics; returns (body, content_type)"""
+    for state in ("open", "idle", "in_use", "waiting"):
+        DB_POOL_CONNECTIONS.labels(state).set(pool_stats[state])
+    DB_POOL_CONNECTIONS.labels("max").set(pool_stats["pool_size"])
+    RESPONSE_CACHE_ENTRIES.set(cache_stats["entries"])
+    RESPONSE_CACHE_BYTES.set(cache_stats["bytes"])
+    return generate_latest(), CONTENT_TYPE_LATEST
\ No newline at end of file
@@ -0,0 +1,65 @@
+import base64
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Opaque keyset cursor for the (sort_value, id) position of a row"""
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        sort_value, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_condition(sort_column: str, id_column: str) -> str:
+    """
+    WHERE fragment selecting rows after a cursor for ORDER BY sort_column DESC, id_column DESC
+    Written as an OR so MySQL can use a range scan on the sort index
+    """
+    return f" AND ({sort_column} < %s OR ({sort_column} = %s AND {id_column} < %s))"
+
+
+def next_cursor(rows: List[dict], limit: int, sort_key: str) -> Optional[str]:
+    """Cursor pointing after the last row, or None when this was the last page"""
+    if len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1][sort_key], rows[-1]['id'])
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def ndjson_response(batches: AsyncIterator[List[dict]]) -> StreamingResponse:
+    """
+    Stream batches of rows as newline-delimited JSON, one row per line
+    The status is sent before the first row, so an error mid-stream ends the
+    body with a {"success": false, "error": ...} line instead of cutting it off
+    """
+    async def lines():
+        try:
+            async for rows in batches:
+                yield "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+        except Exception as e:
+            logger.error(f"NDJSON stream failed: {e}")
+            yield json.dumps({"success": False, "error": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
\ No newline at end of file
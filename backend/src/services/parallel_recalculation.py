@@ -0,0 +1,166 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from backend.src.database import db_cursor
+from backend.src.services.bulk_loader import bulk_load
+from backend.src.services.proper_loss_calculator import (
+    CONSUMPTION_DATA_START,
+    PROBLEMATIC_STATIONS,
+    SESSION_BATCH_SIZE,
+    DISTRIBUTED_COLUMNS,
+    ensure_loss_tables,
+    loss_recalculation_lock,
+    query_daily_data,
+    build_loss_records,
+    save_loss_records,
+    report_progress
+)
+from backend.src.services.rollups import ensure_rollup_tables, rebuild_station_rollups
+from backend.src.services.session_distributor import distribute_sessions
+from backend.src.services.response_cache import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+
+def init_worker_logging():
+    """Initializer for spawned worker processes, which start without logging configured"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+
+def distribute_station(station_id: int) -> dict:
+    """
+    Worker: rebuild rollups and distributed sessions of one station on its own connection
+    Returns counters and the station's distributed date range
+    """
+    with db_cursor() as (connection, cursor):
+        rebuild_station_rollups(cursor, connection, station_id)
+
+        cursor.execute("DELETE FROM distributed_sessions WHERE station_id = %s", (station_id,))
+        connection.commit()
+
+        cursor.execute("""
+            SELECT id, station_id, start_date, end_date, total_kwh
+            FROM charging_sessions
+            WHERE station_id = %s
+            AND total_kwh > 0
+            AND start_date IS NOT NULL
+            AND end_date IS NOT NULL
+            AND end_date >= %s
+            ORDER BY start_date
+        """, (station_id, CONSUMPTION_DATA_START))
+        sessions = cursor.fetchall()
+
+        distributed_count = 0
+        for offset in range(0, len(sessions), SESSION_BATCH_SIZE):
+            records, _ = distribute_sessions(sessions[offset:offset + SESSION_BATCH_SIZE])
+            distributed_count += bulk_load(cursor, connection, 'distributed_sessions', DISTRIBUTED_COLUMNS, records)
+
+        cursor.execute("""
+            SELECT DATE(MIN(interval_15min)) as first_date, DATE(MAX(interval_15min)) as last_date
+            FROM distributed_sessions
+            WHERE station_id = %s
+        """, (station_id,))
+        date_range = cursor.fetchone()
+
+    logger.info(f"   Station {station_id}: {len(sessions)} sessions -> {distributed_count} intervals")
+    return {
+        'station_id': station_id,
+        'sessions': len(sessions),
+        'distributed_records': distributed_count,
+        'first_date': date_range['first_date'],
+        'last_date': date_range['last_date']
+    }
+
+
+def aggregate_station(station_id: int, first_date, last_date) -> int:
+    """Worker: upsert daily loss records of one station; returns number of saved records"""
+    with db_cursor() as (connection, cursor):
+        daily_data = query_daily_data(cursor, first_date, last_date, station_id)
+        stats = {'total': len(daily_data), 'negative_losses': 0, 'high_losses': 0, 'normal': 0, 'with_reactive': 0}
+        loss_records = build_loss_records(daily_data, stats)
+
+        if loss_records:
+            save_loss_records(cursor, loss_records)
+            connection.commit()
+
+    return len(loss_records)
+
+
+def recalculate_parallel(cursor, connection, workers: int, progress=None) -> dict:
+    """
+    Full recalculation partitioned by station over a pool of worker processes
+    Phase 1 distributes sessions per station, phase 2 aggregates daily losses per
+    station over the common date range. Stations never share rows, and loss records
+    are upserted on (station, period), so the partitions merge without conflicts.
+    Returns summary dict with distributed_records and loss_records
+    """
+    ensure_loss_tables(cursor, connection)
+    ensure_rollup_tables(cursor, connection)
+
+    with loss_recalculation_lock(cursor):
+        return _recalculate_parallel(cursor, connection, workers, progress)
+
+
+def _recalculate_parallel(cursor, connection, workers, progress):
+
+    cursor.execute("SELECT CURRENT_TIMESTAMP(6) as started_at")
+    started_at = cursor.fetchone()['started_at']
+
+    cursor.execute("SELECT id FROM stations ORDER BY id")
+    station_ids = [row['id'] for row in cursor.fetchall()]
+    connection.commit()
+
+    logger.info(f"🚀 Parallel recalculation of {len(station_ids)} stations on {workers} workers")
+
+    summary = {'distributed_records': 0, 'loss_records': 0}
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker_logging) as pool:
+        # Phase 1: rollups and session distribution
+        distributed = []
+        futures = [pool.submit(distribute_station, station_id) for station_id in station_ids]
+        for future in as_completed(futures):
+            distributed.append(future.result())
+            summary['distributed_records'] += distributed[-1]['distributed_records']
+            report_progress(
+                progress, "distribute",
+                stations_total=len(station_ids),
+                stations_processed=len(distributed),
+                sessions_processed=sum(result['sessions'] for result in distributed),
+                rows_inserted=summary['distributed_records']
+            )
+
+        first_dates = [result['first_date'] for result in distributed if result['first_date']]
+        last_dates = [result['last_date'] for result in distributed if result['last_date']]
+
+        # Phase 2: daily losses over the same range the sequential pipeline uses
+        if first_dates:
+            first_date = max(min(first_dates), CONSUMPTION_DATA_START.date())
+            last_date = max(last_dates)
+            logger.info(f"📅 Date range: {first_date} to {last_date}")
+
+            stations = [station_id for station_id in station_ids if station_id not in PROBLEMATIC_STATIONS]
+            futures = [pool.submit(aggregate_station, station_id, first_date, last_date) for station_id in stations]
+            for processed, future in enumerate(as_completed(futures), 1):
+                summary['loss_records'] += future.result()
+                report_progress(
+                    progress, "aggregate",
+                    stations_total=len(stations),
+                    stations_processed=processed,
+                    loss_records=summary['loss_records']
+                )
+        else:
+            logger.warning("⚠️ No distributed session data - no losses to calculate")
+
+    cursor.execute("DELETE FROM loss_dirty_partitions WHERE marked_at <= %s", (started_at,))
+    connection.commit()
+    bump_data_version()
+
+    logger.info(
+        f"✅ Parallel recalculation complete: {summary['distributed_records']} distributed records, "
+        f"{summary['loss_records']} loss records"
+    )
+    return summary
\ No newline at end of file
@@ -1,5 +1,11 @@
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import logging
+import time
+from backend.src.services.bulk_loader import bulk_insert, bulk_load
+from backend.src.services.session_distributor import distribute_sessions
+from backend.src.services.rollups import group_date_ranges, rebuild_rollups
+from backend.src.services.response_cache import bump_data_version
 
 logger = logging.getLogger(__name__)
 
@@ -7,22 +13,21 @@ logger = logging.getLogger(__name__)
 CONSUMPTION_DATA_START = datetime(2025, 3, 16)  # When API data actually starts
 PROBLEMATIC_STATIONS = [1, 2]  # UR371 (incomplete consumption), UR372 (incomplete sessions)
 
-def round_to_15min(dt):
-    """Round datetime down to nearest 15-minute interval"""
-    return dt.replace(minute=(dt.minute // 15) * 15, second=0, microsecond=0)
+# Sessions expanded and loaded at once, keeps memory flat on full recalculation
+SESSION_BATCH_SIZE = 10000
+DISTRIBUTED_COLUMNS = ['session_id', 'station_id', 'interval_15min', 'energy_kwh', 'proportion', 'overlap_minutes']
 
+# MySQL named lock shared by every recalculation, whichever process runs it
+LOSS_RECALC_LOCK = 'loss_recalc'
 
-def distribute_session_energy(cursor, connection):
+
+class RecalculationLocked(Exception):
+    """Another loss recalculation holds the lock"""
+
+def ensure_loss_tables(cursor, connection):
     """
-    Create a properly distributed session energy table.
-    Only processes sessions where we have consumption data.
+    Create helper tables used by the loss calculation if they don't exist
     """
-    logger.info("=" * 70)
-    logger.info("STEP 1: Distributing session energy across intervals")
-    logger.info("=" * 70)
-
-    # Create the distributed sessions table
-    logger.info("Creating distributed_sessions table...")
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS distributed_sessions (
             id INT AUTO_INCREMENT PRIMARY KEY,
@@ -32,14 +37,140 @@ def distribute_session_energy(cursor, connection):
             energy_kwh DECIMAL(10, 3) NOT NULL,
             proportion DECIMAL(5, 4) NOT NULL,
             overlap_minutes DECIMAL(6, 2) NOT NULL,
+            interval_date DATE AS (DATE(interval_15min)) STORED,
             FOREIGN KEY (session_id) REFERENCES charging_sessions(id),
             FOREIGN KEY (station_id) REFERENCES stations(id),
             UNIQUE KEY unique_session_interval (session_id, interval_15min),
             INDEX idx_interval (interval_15min),
-            INDEX idx_station_interval (station_id, interval_15min)
+            INDEX idx_station_interval (station_id, interval_15min),
+            INDEX idx_station_date (station_id, interval_date)
+        )
+    """)
+    # Tables created before interval_date existed
+    cursor.execute("SHOW COLUMNS FROM distributed_sessions LIKE 'interval_date'")
+    if not cursor.fetchall():
+        cursor.execute("""
+            ALTER TABLE distributed_sessions
+            ADD COLUMN interval_date DATE AS (DATE(interval_15min)) STORED,
+            ADD INDEX idx_station_date (station_id, interval_date)
+        """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS loss_dirty_partitions (
+            station_id INT NOT NULL,
+            calc_date DATE NOT NULL,
+            marked_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            PRIMARY KEY (station_id, calc_date),
+            FOREIGN KEY (station_id) REFERENCES stations(id)
         )
     """)
     connection.commit()
+
+
+def session_partitions(station_id, start, end):
+    """All (station_id, date) partitions a session from start to end touches"""
+    day = start.date()
+    partitions = set()
+    while day <= end.date():
+        partitions.add((station_id, day))
+        day += timedelta(days=1)
+    return partitions
+
+
+def mark_partitions_dirty(cursor, partitions):
+    """
+    Record (station_id, date) partitions whose consumption or sessions changed
+    The caller commits together with its own writes
+    """
+    if not partitions:
+        return
+
+    cursor.executemany("""
+        INSERT INTO loss_dirty_partitions (station_id, calc_date)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE marked_at = CURRENT_TIMESTAMP(6)
+    """, sorted(partitions))
+
+
+def session_range_end(cursor):
+    """
+    Last day losses are calculated for: the end of the newest session
+    Sessions only arrive by CSV import, so later days would show delivered=0
+    """
+    cursor.execute("""
+        SELECT DATE(MAX(end_date)) as last_date
+        FROM charging_sessions
+        WHERE total_kwh > 0
+        AND start_date IS NOT NULL
+        AND end_date >= %s
+    """, (CONSUMPTION_DATA_START,))
+    return cursor.fetchone()['last_date']
+
+
+def mark_session_range_dirty(cursor, previous_end, new_end):
+    """
+    Mark every station day with consumption that moved into the session range
+    Incremental runs drop dirty partitions past the range, a session import
+    extending it brings them back this way. The caller commits together with its own writes
+    """
+    if new_end is None or (previous_end is not None and new_end <= previous_end):
+        return
+
+    first_date = previous_end + timedelta(days=1) if previous_end else CONSUMPTION_DATA_START.date()
+    cursor.execute("""
+        INSERT INTO loss_dirty_partitions (station_id, calc_date)
+        SELECT station_id, calc_date
+        FROM consumption_daily
+        WHERE calc_date >= %s AND calc_date <= %s
+        ON DUPLICATE KEY UPDATE marked_at = CURRENT_TIMESTAMP(6)
+    """, (first_date, new_end))
+
+
+@contextmanager
+def loss_recalculation_lock(cursor, timeout=-1):
+    """
+    Hold the loss_recalc named lock for the duration of the block
+    Full and incremental recalculations both rewrite distributed_sessions and
+    loss_analysis, so only one may run at a time. A negative timeout waits
+    indefinitely; raises RecalculationLocked when the lock isn't acquired in time.
+    """
+    cursor.execute("SELECT GET_LOCK(%s, %s) as acquired", (LOSS_RECALC_LOCK, timeout))
+    if cursor.fetchone()['acquired'] != 1:
+        raise RecalculationLocked("Another loss recalculation is running")
+    try:
+        yield
+    finally:
+        try:
+            cursor.execute("SELECT RELEASE_LOCK(%s) as released", (LOSS_RECALC_LOCK,))
+            cursor.fetchone()
+        except Exception as e:
+            # A lost connection releases the lock on the server anyway
+            logger.warning(f"Could not release {LOSS_RECALC_LOCK} lock: {e}")
+
+
+def report_progress(progress, step, **counters):
+    """Pass the current step and counters to an optional progress callback"""
+    if progress is not None:
+        progress(step, **counters)
+
+
+def insert_distributed_records(cursor, connection, distributed_records):
+    """Insert distributed records in multi-row chunks within the caller's transaction"""
+    bulk_insert(cursor, connection, 'distributed_sessions', DISTRIBUTED_COLUMNS, distributed_records, commit=False)
+
+
+def distribute_session_energy(cursor, connection, progress=None):
+    """
+    Create a properly distributed session energy table.
+    Only processes sessions where we have consumption data.
+    Returns number of distributed records
+    """
+    logger.info("=" * 70)
+    logger.info("STEP 1: Distributing session energy across intervals")
+    logger.info("=" * 70)
+
+    # Create the distributed sessions table
+    logger.info("Creating distributed_sessions table...")
+    ensure_loss_tables(cursor, connection)
     logger.info("✅ Table created/verified")
 
     # Clear existing data
@@ -72,71 +203,28 @@ def distribute_session_energy(cursor, connection):
 
     if not sessions:
         logger.warning("⚠️ No valid sessions found!")
-        return
+        return 0
 
-    distributed_records = []
+    # Expand and load sessions batch by batch, every chunk is committed on its own
+    logger.info(f"💾 Distributing and inserting records in batches of {SESSION_BATCH_SIZE} sessions...")
+    distributed_count = 0
     skipped_count = 0
+    report_progress(progress, "distribute", sessions_total=len(sessions), sessions_processed=0, rows_inserted=0)
+
+    for offset in range(0, len(sessions), SESSION_BATCH_SIZE):
+        distributed_records, skipped = distribute_sessions(sessions[offset:offset + SESSION_BATCH_SIZE])
+        skipped_count += skipped
+        distributed_count += bulk_load(cursor, connection, 'distributed_sessions', DISTRIBUTED_COLUMNS, distributed_records)
+
+        logger.info(f"   Processed {min(offset + SESSION_BATCH_SIZE, len(sessions))}/{len(sessions)} sessions...")
+        report_progress(
+            progress, "distribute",
+            sessions_total=len(sessions),
+            sessions_processed=min(offset + SESSION_BATCH_SIZE, len(sessions)),
+            rows_inserted=distributed_count
+        )
 
-    for idx, session in enumerate(sessions):
-        session_id = session['id']
-        station_id = session['station_id']
-        start = session['start_date']
-        end = session['end_date']
-        total_kwh = float(session['total_kwh'])
-
-        # Calculate total duration in minutes
-        total_minutes = (end - start).total_seconds() / 60
-
-        if total_minutes <= 0:
-            skipped_count += 1
-            continue
-
-        # Round to 15-min intervals
-        first_interval = round_to_15min(start)
-        last_interval = round_to_15min(end)
-
-        # Generate all 15-minute intervals this session touches
-        current_interval = first_interval
-
-        while current_interval <= last_interval:
-            interval_end = current_interval + timedelta(minutes=15)
-
-            # Calculate overlap with this interval
-            overlap_start = max(start, current_interval)
-            overlap_end = min(end, interval_end)
-            overlap_minutes = (overlap_end - overlap_start).total_seconds() / 60
-
-            if overlap_minutes > 0:
-                # Calculate proportion and energy for this interval
-                proportion = overlap_minutes / total_minutes
-                energy_in_interval = total_kwh * proportion
-
-                distributed_records.append((
-                    session_id,
-                    station_id,
-                    current_interval,
-                    energy_in_interval,
-                    proportion,
-                    overlap_minutes
-                ))
-
-            current_interval = interval_end
-
-        # Progress logging
-        if (idx + 1) % 1000 == 0:
-            logger.info(f"   Processed {idx + 1}/{len(sessions)} sessions...")
-
-    # Insert distributed records
-    if distributed_records:
-        logger.info(f"💾 Inserting {len(distributed_records)} distributed records...")
-
-        cursor.executemany("""
-            INSERT INTO distributed_sessions 
-            (session_id, station_id, interval_15min, energy_kwh, proportion, overlap_minutes)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, distributed_records)
-
-        connection.commit()
+    if distributed_count:
 
         # Verify energy conservation
         cursor.execute("""
@@ -154,7 +242,7 @@ def distribute_session_energy(cursor, connection):
         logger.info(f"   Total sessions in DB: {all_sessions_count}")
         logger.info(f"   Skipped (before {CONSUMPTION_DATA_START.date()}): {skipped_before_date}")
         logger.info(f"   Sessions processed: {len(sessions) - skipped_count}")
-        logger.info(f"   Distributed records created: {len(distributed_records)}")
+        logger.info(f"   Distributed records created: {distributed_count}")
         logger.info(f"   Energy conservation check:")
         logger.info(f"      Original total: {original_total:.3f} kWh")
         logger.info(f"      Distributed total: {distributed_total:.3f} kWh")
@@ -163,78 +251,55 @@ def distribute_session_energy(cursor, connection):
     else:
         logger.warning("⚠️ No valid sessions to distribute")
 
+    return distributed_count
 
-def calculate_losses_with_distribution(cursor, connection):
+
+def daily_data_query(first_date, last_date, station_id=None):
     """
-    Calculate losses using properly distributed session energy
-    NOW INCLUDES REACTIVE POWER TRACKING
+    SQL and parameters of the daily consumption vs. delivered energy query
+    Kept separate so the plan can be checked with EXPLAIN
     """
-    logger.info("")
-    logger.info("=" * 70)
-    logger.info("STEP 2: Calculating losses with proper alignment")
-    logger.info("=" * 70)
-
-    # Verify distributed sessions exist
-    cursor.execute("SELECT COUNT(*) as count FROM distributed_sessions")
-    dist_count = cursor.fetchone()['count']
-
-    if dist_count == 0:
-        logger.error("❌ No distributed session data found!")
-        logger.error("   Run distribute_session_energy() first")
-        return
-
-    logger.info(f"📊 Using {dist_count} distributed session records")
-
-    # Get date range
-    cursor.execute("""
-        SELECT 
-            GREATEST(MIN(DATE(interval_15min)), %s) as first_date,
-            MAX(DATE(interval_15min)) as last_date
-        FROM distributed_sessions
-    """, (CONSUMPTION_DATA_START.date(),))
-
-    date_range = cursor.fetchone()
-    first_date = date_range['first_date']
-    last_date = date_range['last_date']
-
-    logger.info(f"📅 Date range: {first_date} to {last_date}")
-    logger.info(f"⚠️ Excluding problematic stations: {PROBLEMATIC_STATIONS}")
-
-    # Calculate daily aggregations WITH REACTIVE POWER
-    logger.info("🔄 Aggregating daily data (including reactive power)...")
-
-    # Build exclusion list for SQL
     exclusion_list = ','.join(map(str, PROBLEMATIC_STATIONS)) if PROBLEMATIC_STATIONS else '0'
 
-    cursor.execute(f"""
+    station_filter = ""
+    # Half-open [first_date, last_date + 1 day) on the indexed date columns
+    params = [first_date, last_date + timedelta(days=1)]
+    if station_id is not None:
+        station_filter = " AND station_id = %s"
+        params.append(station_id)
+    # Both CTEs filter on the same calendar range (and station)
+    params = params * 2
+
+    return f"""
         WITH daily_consumption AS (
+            -- Read from the daily rollup maintained on every sync
             SELECT 
                 station_id,
-                DATE(timestamp) as calc_date,
+                calc_date,
                 -- Active power (absolute value to handle negatives)
-                SUM(ABS(active_power_kwh)) as total_consumption,
+                active_abs_sum as total_consumption,
                 -- Reactive power (absolute value - we just care about magnitude)
-                SUM(ABS(reactive_power_kwh)) as total_reactive,
-                SUM(active_power_kwh) as raw_consumption,
-                COUNT(*) as measurement_count,
-                SUM(CASE WHEN active_power_kwh < 0 THEN 1 ELSE 0 END) as negative_count
-            FROM power_consumption
-            WHERE DATE(timestamp) >= %s 
-            AND DATE(timestamp) <= %s
-            AND station_id NOT IN ({exclusion_list})
-            GROUP BY station_id, DATE(timestamp)
+                reactive_abs_sum as total_reactive,
+                active_sum as raw_consumption,
+                sample_count as measurement_count,
+                negative_count
+            FROM consumption_daily
+            WHERE calc_date >= %s 
+            AND calc_date < %s
+            AND station_id NOT IN ({exclusion_list}){station_filter}
         ),
         daily_delivered AS (
             SELECT 
                 station_id,
-                DATE(interval_15min) as calc_date,
+                interval_date as calc_date,
                 SUM(energy_kwh) as total_delivered,
                 COUNT(DISTINCT session_id) as session_count
             FROM distributed_sessions
-            WHERE DATE(interval_15min) >= %s 
-            AND DATE(interval_15min) <= %s
-            AND station_id NOT IN ({exclusion_list})
-            GROUP BY station_id, DATE(interval_15min)
+            -- Filters and groups on the stored interval_date, served by idx_station_date
+            WHERE interval_date >= %s 
+            AND interval_date < %s
+            AND station_id NOT IN ({exclusion_list}){station_filter}
+            GROUP BY station_id, interval_date
         ),
         combined_data AS (
             SELECT 
@@ -273,25 +338,24 @@ def calculate_losses_with_distribution(cursor, connection):
         SELECT * FROM combined_data
         WHERE consumption_kwh > 0.001 OR delivered_kwh > 0.001
         ORDER BY calc_date, station_id
-    """, (first_date, last_date, first_date, last_date))
+    """, params
 
-    daily_data = cursor.fetchall()
 
-    if not daily_data:
-        logger.warning("⚠️ No data to calculate losses")
-        return
+def query_daily_data(cursor, first_date, last_date, station_id=None):
+    """
+    Daily consumption vs. delivered energy per station between first_date and last_date
+    Optionally limited to one station
+    """
+    cursor.execute(*daily_data_query(first_date, last_date, station_id))
+    return cursor.fetchall()
 
-    logger.info(f"📊 Processing {len(daily_data)} daily records...")
 
-    # Prepare loss records with validation
+def build_loss_records(daily_data, stats):
+    """
+    Turn daily aggregates into loss_analysis rows, skipping days with mostly negative readings
+    Updates the category counters in stats
+    """
     loss_records = []
-    stats = {
-        'total': len(daily_data),
-        'negative_losses': 0,
-        'high_losses': 0,
-        'normal': 0,
-        'with_reactive': 0
-    }
 
     for record in daily_data:
         station_id = record['station_id']
@@ -338,26 +402,96 @@ def calculate_losses_with_distribution(cursor, connection):
             loss_percentage
         ))
 
+    return loss_records
+
+
+def save_loss_records(cursor, loss_records):
+    cursor.executemany("""
+        INSERT INTO loss_analysis 
+        (station_id, period_start, period_end, 
+         total_consumption_kwh, total_delivered_kwh, total_reactive_kwh,
+         loss_kwh, loss_percentage)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            total_consumption_kwh = VALUES(total_consumption_kwh),
+            total_delivered_kwh = VALUES(total_delivered_kwh),
+            total_reactive_kwh = VALUES(total_reactive_kwh),
+            loss_kwh = VALUES(loss_kwh),
+            loss_percentage = VALUES(loss_percentage),
+            calculated_at = CURRENT_TIMESTAMP
+    """, loss_records)
+
+
+def calculate_losses_with_distribution(cursor, connection, progress=None):
+    """
+    Calculate losses using properly distributed session energy
+    NOW INCLUDES REACTIVE POWER TRACKING
+    Returns number of saved loss records
+    """
+    logger.info("")
+    logger.info("=" * 70)
+    logger.info("STEP 2: Calculating losses with proper alignment")
+    logger.info("=" * 70)
+
+    # Verify distributed sessions exist
+    cursor.execute("SELECT COUNT(*) as count FROM distributed_sessions")
+    dist_count = cursor.fetchone()['count']
+
+    if dist_count == 0:
+        logger.error("❌ No distributed session data found!")
+        logger.error("   Run distribute_session_energy() first")
+        return 0
+
+    logger.info(f"📊 Using {dist_count} distributed session records")
+
+    # Get date range
+    cursor.execute("""
+        SELECT 
+            GREATEST(DATE(MIN(interval_15min)), %s) as first_date,
+            DATE(MAX(interval_15min)) as last_date
+        FROM distributed_sessions
+    """, (CONSUMPTION_DATA_START.date(),))
+
+    date_range = cursor.fetchone()
+    first_date = date_range['first_date']
+    last_date = date_range['last_date']
+
+    logger.info(f"📅 Date range: {first_date} to {last_date}")
+    logger.info(f"⚠️ Excluding problematic stations: {PROBLEMATIC_STATIONS}")
+
+    # Calculate daily aggregations WITH REACTIVE POWER
+    logger.info("🔄 Aggregating daily data (including reactive power)...")
+
+    # Build exclusion list for SQL
+    exclusion_list = ','.join(map(str, PROBLEMATIC_STATIONS)) if PROBLEMATIC_STATIONS else '0'
+
+    report_progress(progress, "aggregate", first_date=str(first_date), last_date=str(last_date))
+    daily_data = query_daily_data(cursor, first_date, last_date)
+
+    if not daily_data:
+        logger.warning("⚠️ No data to calculate losses")
+        return 0
+
+    logger.info(f"📊 Processing {len(daily_data)} daily records...")
+
+    # Prepare loss records with validation
+    stats = {
+        'total': len(daily_data),
+        'negative_losses': 0,
+        'high_losses': 0,
+        'normal': 0,
+        'with_reactive': 0
+    }
+    loss_records = build_loss_records(daily_data, stats)
+
     # Insert loss records
     if loss_records:
         logger.info("💾 Saving loss analysis records...")
 
-        cursor.executemany("""
-            INSERT INTO loss_analysis 
-            (station_id, period_start, period_end, 
-             total_consumption_kwh, total_delivered_kwh, total_reactive_kwh,
-             loss_kwh, loss_percentage)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                total_consumption_kwh = VALUES(total_consumption_kwh),
-                total_delivered_kwh = VALUES(total_delivered_kwh),
-                total_reactive_kwh = VALUES(total_reactive_kwh),
-                loss_kwh = VALUES(loss_kwh),
-                loss_percentage = VALUES(loss_percentage),
-                calculated_at = CURRENT_TIMESTAMP
-        """, loss_records)
+        save_loss_records(cursor, loss_records)
 
         connection.commit()
+        report_progress(progress, "aggregate", loss_records=len(loss_records))
 
         # Summary statistics
         cursor.execute(f"""
@@ -408,10 +542,14 @@ def calculate_losses_with_distribution(cursor, connection):
     else:
         logger.warning("⚠️ No valid records to save")
 
+    return len(loss_records)
 
-def recalculate_everything(cursor, connection):
+
+def recalculate_everything(cursor, connection, progress=None):
     """
     Complete recalculation pipeline with reactive power tracking
+    progress is an optional callback(step, **counters) for job status reporting
+    Returns summary dict with distributed_records and loss_records
     """
     logger.info("")
     logger.info("🚀" * 35)
@@ -424,23 +562,196 @@ def recalculate_everything(cursor, connection):
     logger.info(f"   - Tracking reactive power for power factor analysis")
     logger.info("")
 
-    try:
-        # Step 1: Distribute sessions
-        distribute_session_energy(cursor, connection)
+    with loss_recalculation_lock(cursor):
+        try:
+            cursor.execute("SELECT CURRENT_TIMESTAMP(6) as started_at")
+            started_at = cursor.fetchone()['started_at']
 
-        # Step 2: Calculate losses
-        calculate_losses_with_distribution(cursor, connection)
+            # Step 0: Rebuild consumption rollups from raw data
+            report_progress(progress, "rollups")
+            rebuild_rollups(cursor, connection)
 
-        logger.info("")
-        logger.info("✅" * 35)
-        logger.info("RECALCULATION PIPELINE COMPLETE!")
-        logger.info("✅" * 35)
-        logger.info("")
+            # Step 1: Distribute sessions
+            distributed_records = distribute_session_energy(cursor, connection, progress)
+
+            # Step 2: Calculate losses
+            loss_records = calculate_losses_with_distribution(cursor, connection, progress)
+
+            # Everything marked before the run is now up to date
+            cursor.execute("DELETE FROM loss_dirty_partitions WHERE marked_at <= %s", (started_at,))
+            connection.commit()
+            bump_data_version()
+
+            logger.info("")
+            logger.info("✅" * 35)
+            logger.info("RECALCULATION PIPELINE COMPLETE!")
+            logger.info("✅" * 35)
+            logger.info("")
+
+            return {'distributed_records': distributed_records, 'loss_records': loss_records}
+
+        except Exception as e:
+            logger.error(f"❌ Error during recalculation: {e}")
+            connection.rollback()
+            raise
+
+
+def recalculate_incremental(cursor, connection, progress=None, deadline=None, partitions=None, lock_timeout=-1):
+    """
+    Recalculate losses only for (station, date) partitions marked dirty by
+    new consumption rows or sessions, instead of rebuilding everything
+    Every station is committed on its own. With a deadline (time.monotonic() value)
+    no further station is started once it has passed; the rest stays dirty for the next run.
+    Losses are only written for days the full pipeline covers, from CONSUMPTION_DATA_START
+    to the last session day. Dirty partitions outside are dropped: mark_session_range_dirty
+    marks them again once a session import reaches them.
+    With partitions (set of (station_id, date)) only those dirty partitions are processed.
+    Raises RecalculationLocked when another recalculation holds the lock past lock_timeout.
+    """
+    ensure_loss_tables(cursor, connection)
+
+    with loss_recalculation_lock(cursor, lock_timeout):
+        return _recalculate_incremental(cursor, connection, progress, deadline, partitions)
+
+
+def _recalculate_incremental(cursor, connection, progress, deadline, partitions):
+
+    cursor.execute("SELECT station_id, calc_date, marked_at FROM loss_dirty_partitions")
+    dirty = cursor.fetchall()
+    if partitions is not None:
+        dirty = [row for row in dirty if (row['station_id'], row['calc_date']) in partitions]
+
+    summary = {
+        'partitions': len(dirty),
+        'processed_partitions': 0,
+        'pruned_partitions': 0,
+        'remaining_partitions': 0,
+        'sessions': 0,
+        'distributed_records': 0,
+        'loss_records': 0
+    }
+
+    if not dirty:
+        logger.info("✅ No dirty partitions - losses are up to date")
+        return summary
+
+    dirty_dates = {}
+    dirty_rows = {}
+    for row in dirty:
+        dirty_dates.setdefault(row['station_id'], set()).add(row['calc_date'])
+        dirty_rows.setdefault(row['station_id'], []).append(row)
+
+    logger.info(f"🔄 Incremental recalculation of {len(dirty)} partitions in {len(dirty_dates)} stations")
+
+    # Same bounds as the full pipeline
+    range_end = session_range_end(cursor)
+
+    def in_range(day):
+        return range_end is not None and CONSUMPTION_DATA_START.date() <= day <= range_end
+
+    stats = {'total': 0, 'negative_losses': 0, 'high_losses': 0, 'normal': 0, 'with_reactive': 0}
+
+    for station_index, (station_id, dates) in enumerate(dirty_dates.items()):
+        # The first station always runs so a tight budget still makes progress
+        if deadline is not None and station_index > 0 and time.monotonic() >= deadline:
+            summary['remaining_partitions'] = (
+                summary['partitions'] - summary['processed_partitions'] - summary['pruned_partitions']
+            )
+            logger.info(f"⏳ Time budget used up, {summary['remaining_partitions']} partitions left for the next run")
+            break
+
+        report_progress(
+            progress, "incremental",
+            stations_total=len(dirty_dates),
+            stations_processed=station_index,
+            sessions_processed=summary['sessions'],
+            rows_inserted=summary['distributed_records']
+        )
+        dates = {day for day in dates if in_range(day)}
+        aggregate_dates = set(dates)
+
+        for first_date, last_date in group_date_ranges(dates):
+            range_start = datetime.combine(first_date, datetime.min.time())
+            range_end = datetime.combine(last_date + timedelta(days=1), datetime.min.time())
+
+            # Step 1: re-distribute every session overlapping the dirty days
+            # Sessions without energy are selected too, so a session re-imported
+            # with total_kwh 0 loses the energy distributed for it before
+            cursor.execute("""
+                SELECT id, station_id, start_date, end_date, total_kwh
+                FROM charging_sessions
+                WHERE station_id = %s
+                AND start_date IS NOT NULL
+                AND end_date IS NOT NULL
+                AND end_date >= %s
+                AND end_date >= %s
+                AND start_date < %s
+            """, (station_id, CONSUMPTION_DATA_START, range_start, range_end))
+            sessions = cursor.fetchall()
+
+            if sessions:
+                session_ids = [session['id'] for session in sessions]
+                placeholders = ','.join(['%s'] * len(session_ids))
+                cursor.execute(
+                    f"DELETE FROM distributed_sessions WHERE session_id IN ({placeholders})",
+                    session_ids
+                )
+
+                distributed_records, _ = distribute_sessions(
+                    [session for session in sessions if session['total_kwh'] > 0]
+                )
+                if distributed_records:
+                    insert_distributed_records(cursor, connection, distributed_records)
+
+                # Sessions crossing midnight also change the neighbouring days
+                for session in sessions:
+                    aggregate_dates.update(
+                        day for _, day in session_partitions(station_id, session['start_date'], session['end_date'])
+                    )
+
+                summary['sessions'] += len(sessions)
+                summary['distributed_records'] += len(distributed_records)
+
+        aggregate_dates = {day for day in aggregate_dates if in_range(day)}
+        processed_count = sum(1 for row in dirty_rows[station_id] if in_range(row['calc_date']))
+
+        # Step 2: re-aggregate the affected days
+        if station_id not in PROBLEMATIC_STATIONS:
+            for first_date, last_date in group_date_ranges(aggregate_dates):
+                cursor.execute("""
+                    DELETE FROM loss_analysis
+                    WHERE station_id = %s
+                    AND period_start >= %s AND period_start <= %s
+                    AND period_end = period_start
+                """, (station_id, first_date, last_date))
+
+                daily_data = query_daily_data(cursor, first_date, last_date, station_id)
+                stats['total'] += len(daily_data)
+                loss_records = build_loss_records(daily_data, stats)
+
+                if loss_records:
+                    save_loss_records(cursor, loss_records)
+                    summary['loss_records'] += len(loss_records)
+
+        # Clear processed and out-of-range marks; partitions marked again meanwhile stay dirty
+        cursor.executemany("""
+                DELETE FROM loss_dirty_partitions
+                WHERE station_id = %s AND calc_date = %s AND marked_at <= %s
+            """, [(row['station_id'], row['calc_date'], row['marked_at']) for row in processed_rows])
+
+        connection.commit()
+        summary['processed_partitions'] += processed_count
+        summary['pruned_partitions'] += len(dirty_rows[station_id]) - processed_count
+
+    bump_data_version()
 
-    except Exception as e:
-        logger.error(f"❌ Error during recalculation: {e}")
-        connection.rollback()
-        raise
+    logger.info(
+        f"✅ Incremental recalculation complete: {summary['processed_partitions']}/{summary['partitions']} partitions "
+        f"({summary['pruned_partitions']} outside the session range dropped), "
+        f"{summary['sessions']} sessions, {summary['distributed_records']} distributed records, "
+        f"{summary['loss_records']} loss records"
+    )
+    return summary
 
 
 def get_data_quality_report(cursor):
@@ -452,13 +763,13 @@ def get_data_quality_report(cursor):
     # Check consumption data coverage
     cursor.execute("""
         SELECT 
-            MIN(timestamp) as first_record,
-            MAX(timestamp) as last_record,
-            COUNT(*) as total_records,
-            SUM(CASE WHEN active_power_kwh < 0 THEN 1 ELSE 0 END) as negative_records,
-            SUM(active_power_kwh) as total_active,
-            SUM(ABS(reactive_power_kwh)) as total_reactive
-        FROM power_consumption
+            MIN(first_sample) as first_record,
+            MAX(last_sample) as last_record,
+            CAST(SUM(sample_count) AS UNSIGNED) as total_records,
+            CAST(SUM(negative_count) AS UNSIGNED) as negative_records,
+            SUM(active_sum) as total_active,
+            SUM(reactive_abs_sum) as total_reactive
+        FROM consumption_daily
     """)
     report['consumption_coverage'] = cursor.fetchone()
 
@@ -481,10 +792,10 @@ def get_data_quality_report(cursor):
         cursor.execute(f"""
             SELECT 
                 station_id,
-                COUNT(*) as records,
-                SUM(active_power_kwh) as total_kwh,
-                SUM(CASE WHEN active_power_kwh < 0 THEN 1 ELSE 0 END) as negative_count
-            FROM power_consumption
+                CAST(SUM(sample_count) AS UNSIGNED) as records,
+                SUM(active_sum) as total_kwh,
+                CAST(SUM(negative_count) AS UNSIGNED) as negative_count
+            FROM consumption_daily
             WHERE station_id IN ({placeholders})
             GROUP BY station_id
         """, PROBLEMATIC_STATIONS)
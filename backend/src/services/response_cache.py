@@ -0,0 +1,150 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from backend.src.config import settings
+
+
+class CacheEntry:
+    def __init__(self, body: bytes, etag: str, version: int, expires_at: float):
+        self.body = body
+        self.etag = etag
+        self.version = version
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized JSON responses
+
+    Entries expire after ttl_seconds and whenever the data version changes;
+    writers (sync, CSV import, loss recalculation) bump the version so cached
+    responses never outlive the data they were built from. The cache is
+    bounded by max_entries and by the total size of cached bodies (max_bytes).
+    """
+
+    def __init__(self, ttl_seconds=900, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # Bumped from DB executor threads, read on the event loop
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.version != self._version or entry.expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body: bytes, version: int) -> CacheEntry:
+        # The version only invalidates entries; an unchanged body keeps its ETag across syncs
+        entry = CacheEntry(
+            body,
+            f'"{hashlib.sha1(body).hexdigest()[:16]}"',
+            version,
+            time.monotonic() + self.ttl_seconds
+        )
+        with self._lock:
+            # Built from data that changed meanwhile, or too big to keep
+            if version != self._version or len(body) > self.max_bytes:
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+cache_config = settings.cache_config
+response_cache = ResponseCache(
+    ttl_seconds=cache_config.get('ttl_seconds', 900),
+    max_entries=cache_config.get('max_entries', 256),
+    max_bytes=cache_config.get('max_bytes', 32 * 1024 * 1024)
+)
+
+
+def bump_data_version():
+    """Invalidate cached responses after a write to consumption, sessions or losses"""
+    response_cache.bump_version()
+
+
+def cache_key(request: Request) -> str:
+    params = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{params}|{request.headers.get('accept', '')}"
+
+
+def _json_response(entry: CacheEntry, request: Request) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if entry.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def cached_response(request: Request, build: Callable[[], Awaitable]):
+    """
+    Serve a read endpoint from the cache, building and storing it on a miss
+    Only successful JSON payloads are cached; errors and binary responses pass through.
+    Clients revalidate with If-None-Match and get 304 while the body is unchanged,
+    also after a sync rebuilt it.
+    """
+    if not cache_config.get('enabled', True):
+        return await build()
+
+    key = cache_key(request)
+    entry = response_cache.get(key)
+
+    if entry is None:
+        version = response_cache.version
+        payload = await build()
+        if not isinstance(payload, dict) or not payload.get("success"):
+            return payload
+        body = json.dumps(jsonable_encoder(payload)).encode()
+        entry = response_cache.put(key, body, version)
+
+    return _json_response(entry, request)
\ No newline at end of file
@@ -0,0 +1,128 @@
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Arrow/Parquet output is optional
+    pa = None
+    pq = None
+
+JSON = "json"
+COLUMNAR = "columnar"
+ARROW = "arrow"
+PARQUET = "parquet"
+
+MEDIA_TYPES = {
+    COLUMNAR: "application/x-columnar+json",
+    ARROW: "application/vnd.apache.arrow.stream",
+    PARQUET: "application/vnd.apache.parquet",
+}
+
+# Repeated per row in the row-dict output; sent once in the station lookup instead
+STATION_COLUMNS = ('station_code', 'station_name')
+
+
+def resolve_format(format: Optional[str], accept: Optional[str]) -> str:
+    """Pick the response format from the format= param, falling back to the Accept header"""
+    fmt = _requested_format(format, accept)
+    if fmt in (ARROW, PARQUET) and pa is None:
+        raise HTTPException(status_code=406, detail="Arrow/Parquet output requires pyarrow")
+    return fmt
+
+
+def _requested_format(format: Optional[str], accept: Optional[str]) -> str:
+    if format:
+        format = format.lower()
+        if format not in (JSON, COLUMNAR, ARROW, PARQUET):
+            raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
+        return format
+
+    if accept:
+        for media_range in accept.split(","):
+            media_type = media_range.split(";")[0].strip().lower()
+            for name, known in MEDIA_TYPES.items():
+                if media_type == known:
+                    return name
+    return JSON
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def to_columns(rows: List[dict]) -> Dict[str, list]:
+    """Turn row dicts into parallel column arrays (station names excluded)"""
+    if not rows:
+        return {}
+    names = [name for name in rows[0] if name not in STATION_COLUMNS]
+    return {name: [row[name] for row in rows] for name in names}
+
+
+def station_lookup(rows: List[dict]) -> Dict[int, dict]:
+    stations = {}
+    for row in rows:
+        station_id = row.get('station_id')
+        if station_id is not None and station_id not in stations:
+            stations[station_id] = {name: row.get(name) for name in STATION_COLUMNS}
+    return stations
+
+
+def columnar_payload(rows: List[dict]) -> dict:
+    return {
+        "success": True,
+        "format": COLUMNAR,
+        "count": len(rows),
+        "stations": station_lookup(rows),
+        "columns": {
+            name: [_plain(value) for value in values]
+            for name, values in to_columns(rows).items()
+        }
+    }
+
+
+def _arrow_table(rows: List[dict]):
+    columns = {
+        name: [float(value) if isinstance(value, Decimal) else value for value in values]
+        for name, values in to_columns(rows).items()
+    }
+    # Station names are dictionary-encoded, so they cost one entry per station
+    for name in STATION_COLUMNS:
+        if rows and name in rows[0]:
+            columns[name] = pa.array([row[name] for row in rows]).dictionary_encode()
+    return pa.table(columns)
+
+
+def format_response(rows: List[dict], fmt: str, extra: Optional[dict] = None):
+    """
+    Render rows in the requested format
+    JSON keeps the existing {"success": True, "data": [...]} shape; for binary
+    formats the extra fields are sent as X- headers (next_cursor -> X-Next-Cursor)
+    """
+    if fmt == COLUMNAR:
+        return {**columnar_payload(rows), **(extra or {})}
+
+    if fmt in (ARROW, PARQUET):
+        table = _arrow_table(rows)
+        sink = io.BytesIO()
+        if fmt == ARROW:
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, sink)
+        headers = {
+            "X-" + name.replace("_", "-").title(): str(value)
+            for name, value in (extra or {}).items()
+            if value is not None
+        }
+        return Response(content=sink.getvalue(), media_type=MEDIA_TYPES[fmt], headers=headers)
+
+    return {"success": True, "data": rows, **(extra or {})}
\ No newline at end of file
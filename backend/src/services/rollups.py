@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-bucket aggregates kept for every station, shared by the hourly and daily rollups
+ROLLUP_COLUMNS = [
+    'sample_count', 'negative_count',
+    'active_sum', 'active_abs_sum', 'active_min', 'active_max',
+    'reactive_sum', 'reactive_abs_sum', 'reactive_min', 'reactive_max',
+    'first_sample', 'last_sample'
+]
+
+HOUR_EXPRESSION = "TIMESTAMP(DATE(timestamp), MAKETIME(HOUR(timestamp), 0, 0))"
+
+# Aggregates over raw 15-minute rows
+RAW_AGGREGATES = """
+    COUNT(*),
+    SUM(CASE WHEN active_power_kwh < 0 THEN 1 ELSE 0 END),
+    SUM(active_power_kwh),
+    SUM(ABS(active_power_kwh)),
+    MIN(active_power_kwh),
+    MAX(active_power_kwh),
+    SUM(reactive_power_kwh),
+    SUM(ABS(reactive_power_kwh)),
+    MIN(reactive_power_kwh),
+    MAX(reactive_power_kwh),
+    MIN(timestamp),
+    MAX(timestamp)
+"""
+
+# Aggregates over hourly rollup rows
+HOURLY_AGGREGATES = """
+    SUM(sample_count),
+    SUM(negative_count),
+    SUM(active_sum),
+    SUM(active_abs_sum),
+    MIN(active_min),
+    MAX(active_max),
+    SUM(reactive_sum),
+    SUM(reactive_abs_sum),
+    MIN(reactive_min),
+    MAX(reactive_max),
+    MIN(first_sample),
+    MAX(last_sample)
+"""
+
+UPSERT_SUFFIX = " ON DUPLICATE KEY UPDATE " + ", ".join(
+    f"{column} = VALUES({column})" for column in ROLLUP_COLUMNS
+)
+
+
+def ensure_rollup_tables(cursor, connection):
+    """
+    Create hourly and daily consumption rollups if they don't exist
+    """
+    for table, bucket_column in (('consumption_hourly', 'hour_start DATETIME'), ('consumption_daily', 'calc_date DATE')):
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                station_id INT NOT NULL,
+                {bucket_column} NOT NULL,
+                sample_count INT NOT NULL,
+                negative_count INT NOT NULL,
+                active_sum DECIMAL(14, 3) NOT NULL,
+                active_abs_sum DECIMAL(14, 3) NOT NULL,
+                active_min DECIMAL(10, 3) NOT NULL,
+                active_max DECIMAL(10, 3) NOT NULL,
+                reactive_sum DECIMAL(14, 3) NOT NULL,
+                reactive_abs_sum DECIMAL(14, 3) NOT NULL,
+                reactive_min DECIMAL(10, 3) NOT NULL,
+                reactive_max DECIMAL(10, 3) NOT NULL,
+                first_sample DATETIME NOT NULL,
+                last_sample DATETIME NOT NULL,
+                PRIMARY KEY (station_id, {bucket_column.split()[0]}),
+                FOREIGN KEY (station_id) REFERENCES stations(id)
+            )
+        """)
+    connection.commit()
+
+
+def group_date_ranges(dates):
+    """Group sorted dates into contiguous (first, last) ranges"""
+    ranges = []
+    for day in sorted(dates):
+        if ranges and day - ranges[-1][1] <= timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def _refresh_range(cursor, station_id, first_date, last_date):
+    range_start = datetime.combine(first_date, datetime.min.time())
+    range_end = datetime.combine(last_date + timedelta(days=1), datetime.min.time())
+
+    cursor.execute(f"""
+        INSERT INTO consumption_hourly (station_id, hour_start, {', '.join(ROLLUP_COLUMNS)})
+        SELECT station_id, {HOUR_EXPRESSION} as bucket, {RAW_AGGREGATES}
+        FROM power_consumption
+        WHERE station_id = %s AND timestamp >= %s AND timestamp < %s
+        GROUP BY station_id, bucket
+    """ + UPSERT_SUFFIX, (station_id, range_start, range_end))
+
+    cursor.execute(f"""
+        INSERT INTO consumption_daily (station_id, calc_date, {', '.join(ROLLUP_COLUMNS)})
+        SELECT station_id, DATE(hour_start) as bucket, {HOURLY_AGGREGATES}
+        FROM consumption_hourly
+        WHERE station_id = %s AND hour_start >= %s AND hour_start < %s
+        GROUP BY station_id, bucket
+    """ + UPSERT_SUFFIX, (station_id, range_start, range_end))
+
+
+def refresh_rollups(cursor, partitions):
+    """
+    Recompute hourly and daily rollups of the given (station_id, date) partitions from raw rows
+    Raw rows are only ever upserted, so re-aggregating the touched days is exact.
+    The caller commits together with its own writes
+    """
+    dates_by_station = {}
+    for station_id, day in partitions:
+        dates_by_station.setdefault(station_id, set()).add(day)
+
+    for station_id, dates in dates_by_station.items():
+        for first_date, last_date in group_date_ranges(dates):
+            _refresh_range(cursor, station_id, first_date, last_date)
+
+
+def rebuild_station_rollups(cursor, connection, station_id):
+    """Rebuild both rollups of one station from its raw rows"""
+    cursor.execute("DELETE FROM consumption_daily WHERE station_id = %s", (station_id,))
+    cursor.execute("DELETE FROM consumption_hourly WHERE station_id = %s", (station_id,))
+
+    cursor.execute("""
+        SELECT MIN(timestamp) as first_timestamp, MAX(timestamp) as last_timestamp
+        FROM power_consumption
+        WHERE station_id = %s
+    """, (station_id,))
+    bounds = cursor.fetchone()
+    if bounds['first_timestamp']:
+        _refresh_range(cursor, station_id, bounds['first_timestamp'].date(), bounds['last_timestamp'].date())
+
+    connection.commit()
+
+
+def rebuild_rollups(cursor, connection):
+    """Rebuild both rollups from the whole power_consumption table, one station at a time"""
+    ensure_rollup_tables(cursor, connection)
+
+    cursor.execute("SELECT id FROM stations")
+    station_ids = [row['id'] for row in cursor.fetchall()]
+
+    for station_id in station_ids:
+        rebuild_station_rollups(cursor, connection, station_id)
+
+    logger.info(f"Rebuilt consumption rollups for {len(station_ids)} stations")
+
+
+def rebuild_rollups_if_empty(cursor, connection):
+    """Build the rollups once when they are missing but raw consumption exists"""
+    ensure_rollup_tables(cursor, connection)
+
+    cursor.execute("SELECT 1 FROM consumption_daily LIMIT 1")
+    has_rollups = cursor.fetchone() is not None
+    cursor.execute("SELECT 1 FROM power_consumption LIMIT 1")
+    has_consumption = cursor.fetchone() is not None
+
+    if has_consumption and not has_rollups:
+        logger.info("Consumption rollups are empty, rebuilding from raw data...")
+        rebuild_rollups(cursor, connection)
\ No newline at end of file
@@ -1,68 +1,249 @@
 import asyncio
-from datetime import datetime, timezone
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 import logging
+from backend.src.config import settings
+from backend.src.database import db_cursor, run_db
+from backend.src.services.jobs import job_manager
+from backend.src.services.metrics import RECALCULATION_STEP_SECONDS, SCHEDULER_LAG_SECONDS, SYNC_COALESCED, SYNC_SECONDS
+from backend.src.services.proper_loss_calculator import RecalculationLocked, recalculate_incremental
 from backend.src.services.sync_service import SyncService
 
 logger = logging.getLogger(__name__)
 
+STARTUP = "startup"
+SCHEDULED = "scheduled"
+MANUAL = "manual"
+INITIAL = "initial"
+
+
 class DataScheduler:
+    """
+    Syncs Jasper data on wall-clock aligned ticks (:00, :15, :30, :45 by default)
+    plus a settle delay so the newest sample is already available.
+
+    Only one sync runs at a time: a trigger arriving while a sync is running
+    (e.g. /api/sync-now during the scheduled run) joins that run instead of
+    fetching the same windows again. An initial sync only joins an initial
+    sync reaching as far back, otherwise it waits for the running sync and
+    starts its own. Every run records its timing and lag.
+
+    After a sync that added rows, losses of the touched (station, day)
+    partitions are recalculated incrementally within a time budget. This only
+    covers days inside the session range (late or re-fetched consumption);
+    newer days get losses once a session CSV import reaches them.
+    """
+
     def __init__(self):
         self.sync_service = SyncService()
         self.is_running = False
         self.sync_task = None
         self.startup_complete = False
 
-    async def startup_backfill(self):
+        scheduler_config = settings.scheduler_config
+        self.interval = timedelta(minutes=scheduler_config.get('interval_minutes', 15))
+        self.settle_delay = timedelta(seconds=scheduler_config.get('settle_seconds', 60))
+        self.post_sync_losses = scheduler_config.get('post_sync_losses', True)
+        self.loss_budget_seconds = scheduler_config.get('loss_budget_seconds', 60)
+
+        # The running sync doubles as the sync lock
+        self._current_run: Optional[asyncio.Task] = None
+        # days_back of the running initial sync, None for other triggers
+        self._current_days_back: Optional[int] = None
+        self.next_run_at: Optional[datetime] = None
+        self.runs = 0
+        self.failed_runs = 0
+        self.coalesced_triggers = 0
+        self.history = deque(maxlen=scheduler_config.get('history_size', 50))
+        # Touched partitions the post-sync stage hasn't finished yet (skipped or over budget)
+        self._pending_partitions = set()
+
+    def next_run_time(self, now: datetime) -> datetime:
+        """First aligned tick (plus settle delay) strictly after now"""
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        ticks = (now - day_start - self.settle_delay) // self.interval + 1
+        return day_start + ticks * self.interval + self.settle_delay
+
+    async def run_sync(
+            self,
+            trigger: str = MANUAL,
+            scheduled_for: Optional[datetime] = None,
+            days_back: Optional[int] = None
+    ) -> dict:
         """
-        Run once on startup to backfill any missing data
+        Run a sync, or join the one already running
+        days_back is required for INITIAL, which reloads that many days of history
+        Returns the run record (trigger, timing, lag, records, error, coalesced)
         """
-        try:
-            logger.info("=" * 60)
-            logger.info("STARTUP: Backfilling missing data...")
-            logger.info("=" * 60)
+        while self._current_run is not None and not self._current_run.done():
+            if trigger != INITIAL or (self._current_days_back or 0) >= days_back:
+                self.coalesced_triggers += 1
+                SYNC_COALESCED.inc()
+                logger.info(f"Sync already running, {trigger} trigger joins it")
+                run = await asyncio.shield(self._current_run)
+                return {**run, "coalesced": True}
+
+            logger.info(f"Sync already running, {trigger} sync waits for it")
+            await asyncio.wait([self._current_run])
+
+        self._current_days_back = days_back if trigger == INITIAL else None
+        self._current_run = asyncio.create_task(self._run(trigger, scheduled_for, days_back))
+        run = await asyncio.shield(self._current_run)
+        return {**run, "coalesced": False}
 
-            records = await self.sync_service.backfill_missing_data()
+    async def _run(self, trigger: str, scheduled_for: Optional[datetime], days_back: Optional[int]) -> dict:
+        started_at = datetime.now(timezone.utc)
+        run = {
+            "trigger": trigger,
+            "scheduled_for": scheduled_for.isoformat() if scheduled_for else None,
+            "started_at": started_at.isoformat(),
+            "lag_seconds": round((started_at - scheduled_for).total_seconds(), 3) if scheduled_for else None,
+            "records": 0,
+            "error": None
+        }
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if run["lag_seconds"] is not None:
+            SCHEDULER_LAG_SECONDS.observe(max(0.0, run["lag_seconds"]))
 
-            if records > 0:
-                logger.info(f"Startup backfill: Added {records} missing records")
+        try:
+            if trigger == STARTUP:
+                run["records"] = await self.sync_service.backfill_missing_data()
+            elif trigger == INITIAL:
+                run["records"] = await self.sync_service.initial_sync(days_back)
             else:
-                logger.info("Startup backfill: Database is up to date")
+                run["records"] = await self.sync_service.sync_all_stations()
+        except Exception as e:
+            logger.error(f"Error in {trigger} sync: {e}")
+            run["error"] = str(e)
+            self.failed_runs += 1
 
-            self.startup_complete = True
+        run["sync_seconds"] = round(loop.time() - start, 3)
 
+        touched = self.sync_service.take_touched_partitions()
+        if self.post_sync_losses and (touched or self._pending_partitions):
+            run["losses"] = await self.recalculate_touched_losses(touched)
+
+        run["duration_seconds"] = round(loop.time() - start, 3)
+        SYNC_SECONDS.labels(trigger).observe(run["duration_seconds"])
+        run["finished_at"] = datetime.now(timezone.utc).isoformat()
+        self.runs += 1
+        self.history.append(run)
+
+        logger.info(
+            f"⏱️ {trigger.capitalize()} sync: {run['records']} records in {run['duration_seconds']}s"
+            + (f" (lag {run['lag_seconds']}s)" if run['lag_seconds'] is not None else "")
+        )
+        return run
+
+    async def recalculate_touched_losses(self, touched: set) -> dict:
+        """
+        Post-sync stage: incremental loss recalculation of the partitions this
+        sync wrote, plus those an earlier stage didn't get to. Partitions past the
+        last session day are dropped until a session import reaches them. Dirty
+        partitions from backfills or CSV imports are left to recalculation jobs.
+        Bounded by loss_budget_seconds; skipped while any other recalculation
+        holds the loss_recalc lock.
+        """
+        partitions = self._pending_partitions | touched
+        # Kept until a stage gets through all of them
+        self._pending_partitions = partitions
+
+        active_job = job_manager.active_job()
+        if active_job:
+            logger.info(f"Post-sync loss stage skipped, recalculation job {active_job.id} is running")
+            return {"skipped": True, "reason": f"job {active_job.id} running"}
+
+        budget = self.loss_budget_seconds
+
+        def recalculate():
+            deadline = time.monotonic() + budget
+            with db_cursor() as (connection, cursor):
+                # Don't wait for the lock; the partitions stay pending for the next stage
+                return recalculate_incremental(
+                    cursor, connection, deadline=deadline, partitions=partitions, lock_timeout=0
+                )
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            summary = await run_db(recalculate)
+        except RecalculationLocked:
+            logger.info("Post-sync loss stage skipped, another recalculation holds the lock")
+            return {"skipped": True, "reason": "recalculation lock held"}
         except Exception as e:
-            logger.error(f"Error during startup backfill: {e}")
-            self.startup_complete = True  # Continue anyway
+            logger.error(f"Error in post-sync loss stage: {e}")
+            return {"skipped": False, "error": str(e), "duration_seconds": round(loop.time() - start, 3)}
+
+        if not summary['remaining_partitions']:
+            self._pending_partitions = set()
+
+        duration = round(loop.time() - start, 3)
+        RECALCULATION_STEP_SECONDS.labels("post_sync_incremental").observe(duration)
+        logger.info(
+            f"📉 Post-sync losses: {summary['processed_partitions']}/{summary['partitions']} partitions in {duration}s "
+            f"({summary['pruned_partitions']} past the session range dropped)"
+        )
+        return {"skipped": False, **summary, "duration_seconds": duration}
+
+    async def startup_backfill(self):
+        """
+        Run once on startup to backfill any missing data
+        """
+        logger.info("=" * 60)
+        logger.info("STARTUP: Backfilling missing data...")
+        logger.info("=" * 60)
+
+        run = await self.run_sync(STARTUP)
+
+        if run["error"]:
+            logger.error(f"Error during startup backfill: {run['error']}")
+        elif run["records"] > 0:
+            logger.info(f"Startup backfill: Added {run['records']} missing records")
+        else:
+            logger.info("Startup backfill: Database is up to date")
+
+        self.startup_complete = True  # Continue anyway
 
     async def sync_task_loop(self):
         """
-        Continuously sync data every 15 minutes
+        Sync on every aligned tick; a tick missed by a long run is skipped, not queued
         """
         await self.startup_backfill()
 
         logger.info("=" * 60)
-        logger.info("Starting scheduled sync (every 15 minutes)")
+        logger.info(f"Starting scheduled sync (every {self.interval}, settle delay {self.settle_delay})")
         logger.info("=" * 60)
 
         while self.is_running:
-            try:
-                now = datetime.now(timezone.utc)
-                logger.info(f"⏰ Scheduled sync started: {now.strftime('%Y-%m-%d %H:%M:%S UTC')}")
-
-                records = await self.sync_service.sync_all_stations()
-
-                if records > 0:
-                    logger.info(f"Scheduled sync: Added {records} new records")
-                else:
-                    logger.info("Scheduled sync: No new data available")
+            scheduled_for = self.next_run_time(datetime.now(timezone.utc))
+            self.next_run_at = scheduled_for
+            logger.info(f"Next sync at {scheduled_for.strftime('%Y-%m-%d %H:%M:%S UTC')}")
 
-            except Exception as e:
-                logger.error(f"Error in scheduled sync: {e}")
-                import traceback
-                traceback.print_exc()
+            await asyncio.sleep(max(0.0, (scheduled_for - datetime.now(timezone.utc)).total_seconds()))
+            await self.run_sync(SCHEDULED, scheduled_for)
 
-            logger.info(f"Next sync in 15 minutes...")
-            await asyncio.sleep(15 * 60)
+    def status(self) -> dict:
+        last_run = self.history[-1] if self.history else None
+        lags = [run["lag_seconds"] for run in self.history if run["lag_seconds"] is not None]
+        durations = [run["duration_seconds"] for run in self.history]
+        return {
+            "running": self.is_running,
+            "startup_complete": self.startup_complete,
+            "sync_in_progress": self._current_run is not None and not self._current_run.done(),
+            "interval_seconds": self.interval.total_seconds(),
+            "settle_seconds": self.settle_delay.total_seconds(),
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "coalesced_triggers": self.coalesced_triggers,
+            "max_lag_seconds": max(lags) if lags else None,
+            "avg_duration_seconds": round(sum(durations) / len(durations), 3) if durations else None,
+            "last_run": last_run,
+            "recent_runs": list(self.history)
+        }
 
     def start(self):
         """Start the scheduler"""
@@ -71,10 +252,13 @@ class DataScheduler:
             self.sync_task = asyncio.create_task(self.sync_task_loop())
             logger.info("🚀 Data scheduler started")
 
-    def stop(self):
-        """Stop the scheduler"""
+    async def stop(self):
+        """Stop the scheduler, cancel a running sync and close the Jasper client"""
         if self.is_running:
             self.is_running = False
-            if self.sync_task:
-                self.sync_task.cancel()
+            tasks = [task for task in (self.sync_task, self._current_run) if task is not None and not task.done()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.sync_service.jasper_client.close()
             logger.info("🛑 Data scheduler stopped")
\ No newline at end of file
@@ -0,0 +1,64 @@
+import numpy as np
+
+INTERVAL_US = 15 * 60 * 1_000_000  # 15 minutes in microseconds
+
+
+def distribute_sessions(sessions):
+    """
+    Split sessions into 15-minute intervals proportionally to overlap time
+
+    All sessions are processed at once on epoch-microsecond arrays: every
+    session is repeated once per interval it touches and the overlaps are
+    computed element-wise. Proportions of a session sum up to 1, so the
+    distributed energy equals the session energy.
+
+    Returns (records, skipped_count) where records are
+    (session_id, station_id, interval_15min, energy_kwh, proportion, overlap_minutes)
+    """
+    if not sessions:
+        return [], 0
+
+    session_ids = np.array([s['id'] for s in sessions], dtype=np.int64)
+    station_ids = np.array([s['station_id'] for s in sessions], dtype=np.int64)
+    starts = np.array([s['start_date'] for s in sessions], dtype='datetime64[us]').astype(np.int64)
+    ends = np.array([s['end_date'] for s in sessions], dtype='datetime64[us]').astype(np.int64)
+    totals = np.array([float(s['total_kwh']) for s in sessions], dtype=np.float64)
+
+    durations = ends - starts
+    valid = durations > 0
+    skipped_count = int(np.count_nonzero(~valid))
+
+    session_ids, station_ids = session_ids[valid], station_ids[valid]
+    starts, ends, totals, durations = starts[valid], ends[valid], totals[valid], durations[valid]
+
+    if len(starts) == 0:
+        return [], skipped_count
+
+    # Intervals touched by each session, from floor(start) to floor(end)
+    first_intervals = starts // INTERVAL_US * INTERVAL_US
+    interval_counts = (ends // INTERVAL_US * INTERVAL_US - first_intervals) // INTERVAL_US + 1
+
+    owner = np.repeat(np.arange(len(starts)), interval_counts)
+    offsets = np.arange(len(owner)) - np.repeat(np.cumsum(interval_counts) - interval_counts, interval_counts)
+    interval_starts = first_intervals[owner] + offsets * INTERVAL_US
+
+    overlap = (
+        np.minimum(ends[owner], interval_starts + INTERVAL_US)
+        - np.maximum(starts[owner], interval_starts)
+    )
+    keep = overlap > 0
+    owner, interval_starts, overlap = owner[keep], interval_starts[keep], overlap[keep]
+
+    proportions = overlap / durations[owner]
+    energies = totals[owner] * proportions
+    overlap_minutes = overlap / 60_000_000
+
+    records = list(zip(
+        session_ids[owner].tolist(),
+        station_ids[owner].tolist(),
+        interval_starts.astype('datetime64[us]').tolist(),
+        energies.tolist(),
+        proportions.tolist(),
+        overlap_minutes.tolist()
+    ))
+    return records, skipped_count
@@ -1,16 +1,107 @@
+import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
-from backend.src.services.jasper_client import JasperClient
-from backend.src.database import get_db_connection
+from backend.src.services.jasper_client import JasperClient, JasperFetchError
+from backend.src.database import db_cursor, run_db
+from backend.src.services.bulk_loader import bulk_insert
+from backend.src.services.proper_loss_calculator import mark_partitions_dirty
+from backend.src.services.rollups import ensure_rollup_tables, refresh_rollups
+from backend.src.services.response_cache import bump_data_version
+from backend.src.services.metrics import ROWS_UPSERTED
 
 logger = logging.getLogger(__name__)
 
-class SyncService:
-    def __init__(self):
-        self.jasper_client = JasperClient()
+SAMPLE_INTERVAL = timedelta(minutes=15)
+# Gaps closer than this are fetched as one range instead of two requests
+GAP_MERGE_TOLERANCE = timedelta(hours=1)
+
+ACTIVE_TYPES = ['active', 'active_master', 'active_slave']
+REACTIVE_TYPES = ['reactive', 'reactive_master', 'reactive_slave']
+
+
+def parse_timestamp(ts: str) -> datetime:
+    return datetime.fromisoformat(ts.replace('Z', '+00:00'))
+
+
+def aggregate_energy(power_data: Dict[str, List]) -> List[tuple]:
+    """
+    Sum 15-minute energy (abs(value) * 0.25) per timestamp, separately for
+    active (kWh) and reactive (kVArh) power types
+    Single pass over all samples; every distinct timeStamp is parsed only once
+    Returns list of (datetime, active_kwh, reactive_kvarh) sorted by time
+    """
+    totals = {}
+    for p_type in ACTIVE_TYPES + REACTIVE_TYPES:
+        column = 1 if p_type in REACTIVE_TYPES else 0
+        for item in power_data.get(p_type) or []:
+            ts = item['timeStamp']
+            if ts not in totals:
+                totals[ts] = [0, 0]
+            totals[ts][column] += abs(float(item['value'])) * 0.25
+
+    return sorted((parse_timestamp(ts), active, reactive) for ts, (active, reactive) in totals.items())
+
+
+def ensure_consumption_key(cursor, connection) -> set:
+    """
+    Add unique_station_time to power_consumption tables created before it existed
+    Without it the upserts never update and every re-fetched sample is inserted again.
+    Duplicate samples are removed first, keeping the newest row of each (station, timestamp).
+    Returns the (station_id, date) partitions that had duplicates; their rollups are
+    refreshed and losses marked dirty
+    """
+    cursor.execute("SHOW INDEX FROM power_consumption WHERE Key_name = 'unique_station_time'")
+    if cursor.fetchall():
+        return set()
+
+    cursor.execute("""
+        SELECT DISTINCT station_id, DATE(timestamp) as calc_date
+        FROM power_consumption
+        GROUP BY station_id, timestamp
+        HAVING COUNT(*) > 1
+    """)
+    partitions = {(row['station_id'], row['calc_date']) for row in cursor.fetchall()}
+
+    if partitions:
+        cursor.execute("""
+            DELETE older
+            FROM power_consumption older
+            JOIN power_consumption newer
+                ON newer.station_id = older.station_id
+                AND newer.timestamp = older.timestamp
+                AND newer.id > older.id
+        """)
+        logger.info(f"Removed {cursor.rowcount} duplicate consumption rows in {len(partitions)} partitions")
+        connection.commit()
+
+    cursor.execute("ALTER TABLE power_consumption ADD UNIQUE KEY unique_station_time (station_id, timestamp)")
+
+    if partitions:
+        # The rollups summed the duplicates too
+        ensure_rollup_tables(cursor, connection)
+        refresh_rollups(cursor, partitions)
+        mark_partitions_dirty(cursor, partitions)
+        connection.commit()
+        bump_data_version()
 
-    async def get_last_sync_time(self, cursor, station_id: int) -> datetime:
+    return partitions
+
+
+class SyncService:
+    def __init__(self, jasper_client: Optional[JasperClient] = None):
+        self.jasper_client = jasper_client or JasperClient()
+        # (station_id, date) partitions written since the last take_touched_partitions()
+        self.touched_partitions = set()
+        # station_id -> station_code, metrics are labelled by code like the Jasper fetches
+        self._station_codes = {}
+
+    def take_touched_partitions(self) -> set:
+        """Return the partitions written since the previous call and start a new set"""
+        partitions, self.touched_partitions = self.touched_partitions, set()
+        return partitions
+
+    def get_last_sync_time(self, cursor, station_id: int) -> datetime:
         cursor.execute("""
             SELECT MAX(timestamp) as last_timestamp 
             FROM power_consumption 
@@ -23,12 +114,31 @@ class SyncService:
         else:
             return datetime.utcnow() - timedelta(hours=24)
 
-    async def sync_station_data(self, station_id: int, station_code: str):
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+    def get_stations(self) -> List[Dict]:
+        with db_cursor() as (connection, cursor):
+            cursor.execute("SELECT id, station_code FROM stations")
+            return cursor.fetchall()
+
+    def station_code(self, cursor, station_id: int) -> str:
+        if station_id not in self._station_codes:
+            cursor.execute("SELECT station_code FROM stations WHERE id = %s", (station_id,))
+            row = cursor.fetchone()
+            self._station_codes[station_id] = row['station_code'] if row else str(station_id)
+        return self._station_codes[station_id]
+
+    def load_last_sync_time(self, station_id: int) -> datetime:
+        with db_cursor() as (connection, cursor):
+            return self.get_last_sync_time(cursor, station_id)
 
+    def insert_power_data(self, station_id: int, power_data: Dict[str, List]) -> int:
+        with db_cursor() as (connection, cursor):
+            return self.process_and_insert_data(cursor, connection, station_id, power_data)
+
+    async def sync_station_data(self, station_id: int, station_code: str):
+        # All blocking DB work runs on the DB executor; pooled connections are
+        # never held while waiting for Jasper
         try:
-            last_sync = await self.get_last_sync_time(cursor, station_id)
+            last_sync = await run_db(self.load_last_sync_time, station_id)
             start_time = last_sync
             end_time = datetime.utcnow()
 
@@ -42,68 +152,78 @@ class SyncService:
                 logger.info(f"No data for station {station_code}")
                 return 0
 
-            records_added = await self.process_and_insert_data(
-                cursor, connection, station_id, power_data
-            )
+            records_added = await run_db(self.insert_power_data, station_id, power_data)
 
             logger.info(f"Synced {records_added} records for {station_code}")
             return records_added
 
+        except JasperFetchError as e:
+            # Nothing stored; the next sync starts from the same last timestamp
+            logger.error(f"Jasper fetch failed for {station_code}, will retry next sync: {e}")
+            return 0
         except Exception as e:
             logger.error(f"Sync error {station_code}: {e}")
-            connection.rollback()
             return 0
-        finally:
-            cursor.close()
-            connection.close()
-
-    async def process_and_insert_data(self, cursor, connection, station_id: int, power_data: Dict[str, List]) -> int:
-        active_types = ['active', 'active_master', 'active_slave']
-        consumption_records = []
-
-        timestamps = set()
-        for p_type in active_types:
-            if p_type in power_data:
-                for item in power_data[p_type]:
-                    timestamps.add(item['timeStamp'])
-
-        for ts in sorted(timestamps):
-            dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-            active_total = 0
 
-            for p_type in active_types:
-                if p_type in power_data:
-                    for item in power_data[p_type]:
-                        if item['timeStamp'] == ts:
-                            active_total += abs(float(item['value'])) * 0.25
-
-            consumption_records.append((dt, station_id, active_total, 0)) # 0 pro jalový
+    def process_and_insert_data(self, cursor, connection, station_id: int, power_data: Dict[str, List]) -> int:
+        consumption_records = [
+            (dt, station_id, active_total, reactive_total)
+            for dt, active_total, reactive_total in aggregate_energy(power_data)
+        ]
 
         if consumption_records:
-            cursor.executemany("""
-                INSERT INTO power_consumption (timestamp, station_id, active_power_kwh, reactive_power_kwh)
-                VALUES (%s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE active_power_kwh = VALUES(active_power_kwh)
-            """, consumption_records)
+            # Upsert, dirty marks and rollup refresh commit together, so the
+            # rollups never lag behind committed raw rows
+            partitions = {(station_id, record[0].date()) for record in consumption_records}
+            mark_partitions_dirty(cursor, partitions)
+            bulk_insert(
+                cursor, connection, 'power_consumption',
+                ['timestamp', 'station_id', 'active_power_kwh', 'reactive_power_kwh'],
+                consumption_records,
+                update_columns=['active_power_kwh', 'reactive_power_kwh'],
+                commit=False
+            )
+
+            # Re-aggregate the touched days into the hourly/daily rollups
+            refresh_rollups(cursor, partitions)
             connection.commit()
+            bump_data_version()
+            self.touched_partitions.update(partitions)
+
+        ROWS_UPSERTED.labels(self.station_code(cursor, station_id)).observe(len(consumption_records))
 
         return len(consumption_records)
 
-    async def sync_all_stations(self):
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+    async def fetch_stations_power_data(self, stations: List[Dict], start_time: datetime, end_time: datetime) -> List[Optional[Dict[str, List]]]:
+        """
+        Fetch power data for all given stations at once
+        Returns list of power_type -> history items, in the order of stations;
+        None for stations whose fetch failed
+        """
+        results = await asyncio.gather(*[
+            self.jasper_client.get_station_power_data(station['station_code'], start_time, end_time)
+            for station in stations
+        ], return_exceptions=True)
+
+        power_data = []
+        for station, result in zip(stations, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Fetch failed for {station['station_code']} ({start_time} -> {end_time}): {result}")
+                result = None
+            power_data.append(result)
+        return power_data
 
+    async def sync_all_stations(self):
         try:
-            cursor.execute("SELECT id, station_code FROM stations")
-            stations = cursor.fetchall()
+            stations = await run_db(self.get_stations)
 
-            total_records = 0
-
-            for station in stations:
-                records = await self.sync_station_data(
-                    station['id'], station['station_code']
-                )
-                total_records += records
+            # Stations are synced concurrently; JasperClient bounds the number
+            # of requests in flight across all of them
+            results = await asyncio.gather(*[
+                self.sync_station_data(station['id'], station['station_code'])
+                for station in stations
+            ])
+            total_records = sum(results)
 
             logger.info(f"Total synced records: {total_records}")
             return total_records
@@ -111,37 +231,25 @@ class SyncService:
         except Exception as e:
             logger.error(f"Error syncing all stations: {e}")
             return 0
-        finally:
-            cursor.close()
-            connection.close()
 
     async def initial_sync(self, days_back: int = 7):
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
         try:
-            cursor.execute("SELECT id, station_code FROM stations")
-            stations = cursor.fetchall()
+            stations = await run_db(self.get_stations)
 
             end_time = datetime.utcnow()
             start_time = end_time - timedelta(days=days_back)
 
             total_records = 0
 
-            for station in stations:
+            logger.info(f"Initial sync for {len(stations)} stations...")
+            all_power_data = await self.fetch_stations_power_data(stations, start_time, end_time)
+
+            for station, power_data in zip(stations, all_power_data):
                 station_code = station['station_code']
                 station_id = station['id']
 
-                logger.info(f"Initial sync for {station_code}...")
-
-                power_data = await self.jasper_client.get_station_power_data(
-                    station_code, start_time, end_time
-                )
-
                 if power_data:
-                    records = await self.process_and_insert_data(
-                        cursor, connection, station_id, power_data
-                    )
+                    records = await run_db(self.insert_power_data, station_id, power_data)
                     total_records += records
                     logger.info(f"Loaded {records} historical records for {station_code}")
 
@@ -150,41 +258,109 @@ class SyncService:
 
         except Exception as e:
             logger.error(f"Error in initial sync: {e}")
-            connection.rollback()
             return 0
-        finally:
-            cursor.close()
-            connection.close()
 
-    async def sync_all_stations_in_range(self, start_time: datetime, end_time: datetime):
+    def find_missing_ranges(self, cursor) -> Dict[int, List[tuple]]:
         """
-        Synchronizuje všechna data pro všechny stanice v zadaném časovém rozmezí.
-        Ideální pro historický backfill po malých kouscích.
+        Detect missing 15-minute slots for every station
+        Returns station_id -> list of (start, end) ranges to fetch, merged into contiguous ranges
         """
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
+        # One windowed pass over idx_station_time: every row is compared with
+        # the previous sample of the same station
+        cursor.execute("""
+            SELECT station_id, gap_start, gap_end
+            FROM (
+                SELECT 
+                    station_id,
+                    LAG(timestamp) OVER (PARTITION BY station_id ORDER BY timestamp) as gap_start,
+                    timestamp as gap_end
+                FROM power_consumption
+            ) samples
+            WHERE gap_start IS NOT NULL
+            AND TIMESTAMPDIFF(MINUTE, gap_start, gap_end) > %s
+            ORDER BY station_id, gap_start
+        """, (int(SAMPLE_INTERVAL.total_seconds() // 60),))
+
+        gaps = {}
+        for row in cursor.fetchall():
+            gaps.setdefault(row['station_id'], []).append((row['gap_start'], row['gap_end']))
+
+        # Trailing gap: from the last sample (or last 24 hours for empty stations) until now
+        cursor.execute("""
+            SELECT s.id as station_id, MAX(pc.timestamp) as last_timestamp
+            FROM stations s
+            LEFT JOIN power_consumption pc ON pc.station_id = s.id
+            GROUP BY s.id
+        """)
+        now = datetime.utcnow()
+        for row in cursor.fetchall():
+            last_timestamp = row['last_timestamp'] or now - timedelta(hours=24)
+            if now - last_timestamp > SAMPLE_INTERVAL:
+                gaps.setdefault(row['station_id'], []).append((last_timestamp, now))
+
+        return {station_id: self.merge_ranges(ranges) for station_id, ranges in gaps.items()}
+
+    @staticmethod
+    def merge_ranges(ranges: List[tuple]) -> List[tuple]:
+        """Merge overlapping or nearby (start, end) ranges"""
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start - merged[-1][1] <= GAP_MERGE_TOLERANCE:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    async def sync_station_range(self, station_id: int, station_code: str, start_time: datetime, end_time: datetime) -> int:
         try:
-            cursor.execute("SELECT id, station_code FROM stations")
-            stations = cursor.fetchall()
+            power_data = await self.jasper_client.get_station_power_data(
+                station_code, start_time, end_time
+            )
 
-            total_records = 0
-            for station in stations:
-                logger.info(f"Backfilling {station['station_code']} ({start_time.date()})")
+            if not power_data:
+                return 0
 
-                # Voláme tvůj existující Jasper klients
-                power_data = await self.jasper_client.get_station_power_data(
-                    station['station_code'], start_time, end_time
-                )
+            return await run_db(self.insert_power_data, station_id, power_data)
 
-                if power_data:
-                    records = await self.process_and_insert_data(
-                        cursor, connection, station['id'], power_data
-                    )
-                    total_records += records
+        except JasperFetchError as e:
+            # The gap stays in power_consumption and is found again next time
+            logger.error(f"Jasper fetch failed for {station_code}, range left for the next backfill: {e}")
+            return 0
+        except Exception as e:
+            logger.error(f"Sync error {station_code} ({start_time} -> {end_time}): {e}")
+            return 0
 
-            return total_records
-        finally:
-            cursor.close()
-            connection.close()
+    async def backfill_missing_data(self) -> int:
+        """
+        Find holes in power_consumption and fetch only the missing ranges
+        All ranges of all stations are fetched concurrently
+        """
+        def load_missing():
+            with db_cursor() as (connection, cursor):
+                cursor.execute("SELECT id, station_code FROM stations")
+                station_codes = {s['id']: s['station_code'] for s in cursor.fetchall()}
+                return station_codes, self.find_missing_ranges(cursor)
+
+        station_codes, missing = await run_db(load_missing)
+
+        work = [
+            (station_id, station_codes[station_id], start, end)
+            for station_id, ranges in missing.items()
+            if station_id in station_codes
+            for start, end in ranges
+        ]
+
+        if not work:
+            logger.info("No missing data found")
+            return 0
+
+        for station_id, station_code, start, end in work:
+            logger.info(f"Missing data for {station_code}: {start} -> {end}")
+
+        results = await asyncio.gather(*[
+            self.sync_station_range(*item) for item in work
+        ])
+        total_records = sum(results)
 
+        logger.info(f"Backfilled {total_records} records in {len(work)} ranges")
+        return total_records
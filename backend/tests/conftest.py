@@ -0,0 +1,22 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def mysql_cursor():
+    """Dictionary cursor on the configured database; skips the test when it can't be reached"""
+    pytest.importorskip("mysql.connector")
+    pytest.importorskip("dotenv")
+    pytest.importorskip("prometheus_client")
+    from backend.src.database import get_pool
+
+    pool = get_pool()
+    try:
+        connection = pool.acquire()
+    except Exception as e:
+        pytest.skip(f"No database available: {e}")
+    cursor = connection.cursor(dictionary=True)
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+        pool.release(connection)
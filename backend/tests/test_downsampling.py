@@ -0,0 +1,26 @@
+from backend.src.services.downsampling import lttb
+
+
+def test_short_series_is_kept_whole():
+    assert lttb([1, 2, 3], 10) == [0, 1, 2]
+    assert lttb([1, 2, 3, 4], 2) == [0, 1, 2, 3]
+
+
+def test_keeps_endpoints_and_threshold_points():
+    values = [float(i % 7) for i in range(100)]
+    indices = lttb(values, 20)
+
+    assert len(indices) == 20
+    assert indices[0] == 0 and indices[-1] == 99
+    assert indices == sorted(set(indices))
+
+
+def test_keeps_spikes():
+    values = [0.0] * 200
+    values[57] = 100.0
+    values[143] = -80.0
+
+    indices = lttb(values, 10)
+
+    assert 57 in indices
+    assert 143 in indices
\ No newline at end of file
@@ -0,0 +1,210 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dotenv")
+pytest.importorskip("prometheus_client")
+
+from backend.src.config import settings
+from backend.src.services import jasper_client
+from backend.src.services.jasper_client import (
+    JasperClient, JasperFetchError, parse_retry_after, split_window, stitch_histories
+)
+from backend.src.services.rate_limiter import RateLimiter
+
+START = datetime(2025, 3, 16, tzinfo=timezone.utc)
+END = START + timedelta(days=1)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(settings.jasper_config, 'api_key', 'key')
+    monkeypatch.setitem(settings.jasper_config, 'domain_id', 'domain')
+    monkeypatch.setattr(jasper_client, '_breakers', {})
+
+    client = JasperClient(rate_limiter=RateLimiter(1000, burst=1000))
+    client.backoff_base = 0
+    client.requests = []
+
+    def serve(handler):
+        def record(request):
+            client.requests.append(request)
+            return handler(request)
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(record))
+
+    client.serve = serve
+    return client
+
+
+def history(*values):
+    return {"historyValues": [{"timeStamp": ts, "value": value} for ts, value in values]}
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=120)
+    assert 100 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_backoff_honours_retry_after_and_caps(client):
+    client.backoff_base, client.backoff_max = 1, 30
+
+    assert client._backoff(0, 7.5) == 7.5
+    assert client._backoff(0, 3600) == 30
+    for attempt in range(8):
+        delays = [client._backoff(attempt, None) for _ in range(50)]
+        assert all(0 <= delay <= min(30, 2 ** attempt) for delay in delays)
+
+
+def test_retries_retryable_status_then_succeeds(client):
+    responses = iter([
+        httpx.Response(503),
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(200, json=history(("2025-03-16T00:00:00Z", 1.5))),
+    ])
+    client.serve(lambda request: next(responses))
+    delays = []
+    backoff = client._backoff
+    client._backoff = lambda attempt, retry_after: delays.append((attempt, retry_after)) or backoff(attempt, 0)
+
+    result = asyncio.run(client.fetch_history("dp-1", START, END, "PT15M"))
+
+    assert result.ok and result.attempts == 3 and result.status == 200
+    assert result.items == [{"timeStamp": "2025-03-16T00:00:00Z", "value": 1.5}]
+    assert delays == [(0, None), (1, 2.0)]
+    assert json.loads(client.requests[0].content) == {
+        "start": "2025-03-16T00:00:00Z", "end": "2025-03-17T00:00:00Z", "step": "PT15M"
+    }
+
+
+def test_client_error_is_not_retried(client):
+    client.serve(lambda request: httpx.Response(400, text="bad range"))
+
+    result = asyncio.run(client.fetch_history("dp-1", START, END))
+
+    assert not result.ok and result.attempts == 1 and result.status == 400
+    with pytest.raises(JasperFetchError) as error:
+        result.raise_for_error()
+    assert error.value.data_point_id == "dp-1" and error.value.status == 400
+
+
+def test_transport_errors_are_retried_until_exhausted(client):
+    client.max_retries = 2
+
+    def fail(request):
+        raise httpx.ConnectError("connection refused", request=request)
+    client.serve(fail)
+
+    result = asyncio.run(client.fetch_history("dp-1", START, END))
+
+    assert not result.ok and result.attempts == 3
+    assert "ConnectError" in result.error
+
+
+def test_unexpected_format_is_a_failure_not_empty_data(client):
+    client.serve(lambda request: httpx.Response(200, json={"unexpected": True}))
+
+    result = asyncio.run(client.fetch_history("dp-1", START, END))
+
+    assert not result.ok and result.items == []
+
+
+def test_open_circuit_stops_requests(client, monkeypatch):
+    monkeypatch.setitem(settings.jasper_config, 'resilience', {'circuit_failure_threshold': 2})
+    client.max_retries = 0
+    client.serve(lambda request: httpx.Response(503))
+
+    first = asyncio.run(client.fetch_history("dp-1", START, END))
+    second = asyncio.run(client.fetch_history("dp-1", START, END))
+    third = asyncio.run(client.fetch_history("dp-1", START, END))
+
+    assert first.error == second.error == "HTTP 503"
+    assert third.error == "circuit open" and third.attempts == 0
+    assert len(client.requests) == 2
+    # Other data points have their own circuit
+    assert asyncio.run(client.fetch_history("dp-2", START, END)).error == "HTTP 503"
+
+
+def test_station_fails_when_any_data_point_fails(client, monkeypatch):
+    monkeypatch.setitem(settings.jasper_config, 'data_points', {"UR371": {"active": "dp-ok", "reactive": "dp-bad"}})
+
+    def handler(request):
+        if "dp-bad" in request.url.path:
+            return httpx.Response(404)
+        return httpx.Response(200, json=history(("2025-03-16T00:00:00Z", 1)))
+    client.serve(handler)
+
+    with pytest.raises(JasperFetchError) as error:
+        asyncio.run(client.get_station_power_data("UR371", START, END))
+    assert error.value.data_point_id == "dp-bad"
+
+
+def test_split_window():
+    week = timedelta(days=7)
+
+    assert split_window(START, START + timedelta(days=3), week) == [(START, START + timedelta(days=3))]
+    assert split_window(START, START + timedelta(days=16), week) == [
+        (START, START + week),
+        (START + week, START + 2 * week),
+        (START + 2 * week, START + timedelta(days=16)),
+    ]
+    # Exact multiple: no empty trailing window
+    assert split_window(START, START + 2 * week, week) == [(START, START + week), (START + week, START + 2 * week)]
+    assert split_window(START, START, week) == [(START, START)]
+
+
+def test_stitch_histories_orders_and_dedupes_boundaries():
+    stitched = stitch_histories([
+        [{"timeStamp": "2025-03-23T00:00:00Z", "value": 1}, {"timeStamp": "2025-03-22T23:45:00Z", "value": 0}],
+        [],
+        [{"timeStamp": "2025-03-23T00:00:00.000Z", "value": 2}, {"timeStamp": "2025-03-23T00:15:00Z", "value": 3}],
+        [{"timeStamp": "2025-03-16T00:00:00Z", "value": 4}],
+    ])
+
+    assert [item["value"] for item in stitched] == [4, 0, 2, 3]
+
+
+def test_long_range_is_fetched_in_windows_and_stitched(client):
+    client.max_window = timedelta(days=7)
+
+    def handler(request):
+        start = json.loads(request.content)["start"]
+        end = json.loads(request.content)["end"]
+        # Windows share their boundary sample
+        return httpx.Response(200, json=history((start, 1), (end, 1)))
+    client.serve(handler)
+
+    result = asyncio.run(client.fetch_history("dp-1", START, START + timedelta(days=20)))
+
+    assert result.ok and result.attempts == 3
+    assert sorted(json.loads(request.content)["start"] for request in client.requests) == [
+        "2025-03-16T00:00:00Z", "2025-03-23T00:00:00Z", "2025-03-30T00:00:00Z"
+    ]
+    assert [item["timeStamp"] for item in result.items] == [
+        "2025-03-16T00:00:00Z", "2025-03-23T00:00:00Z", "2025-03-30T00:00:00Z", "2025-04-05T00:00:00Z"
+    ]
+
+
+def test_failed_window_fails_the_whole_range(client):
+    client.max_window = timedelta(days=7)
+
+    def handler(request):
+        if json.loads(request.content)["start"] == "2025-03-23T00:00:00Z":
+            return httpx.Response(400)
+        return httpx.Response(200, json=history(("2025-03-16T00:00:00Z", 1)))
+    client.serve(handler)
+
+    result = asyncio.run(client.fetch_history("dp-1", START, START + timedelta(days=20)))
+
+    assert not result.ok and result.items == [] and result.status == 400
+    assert "1/3 windows failed" in result.error
\ No newline at end of file
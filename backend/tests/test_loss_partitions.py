@@ -0,0 +1,57 @@
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dotenv")
+
+from backend.src.services.proper_loss_calculator import (
+    CONSUMPTION_DATA_START, mark_session_range_dirty, session_partitions
+)
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+
+def test_session_partitions_cover_every_day():
+    assert session_partitions(3, datetime(2025, 3, 20, 22, 0), datetime(2025, 3, 22, 1, 0)) == {
+        (3, date(2025, 3, 20)), (3, date(2025, 3, 21)), (3, date(2025, 3, 22))
+    }
+
+
+def test_extended_session_range_marks_the_new_days():
+    cursor = RecordingCursor()
+
+    mark_session_range_dirty(cursor, date(2025, 4, 30), date(2025, 5, 31))
+
+    [(sql, params)] = cursor.executed
+    assert "INSERT INTO loss_dirty_partitions" in sql
+    assert params == (date(2025, 5, 1), date(2025, 5, 31))
+
+
+def test_first_session_range_starts_at_consumption_data():
+    cursor = RecordingCursor()
+
+    mark_session_range_dirty(cursor, None, date(2025, 4, 30))
+
+    assert cursor.executed[0][1] == (CONSUMPTION_DATA_START.date(), date(2025, 4, 30))
+
+
+@pytest.mark.parametrize("previous_end, new_end", [
+    (date(2025, 4, 30), date(2025, 4, 30)),
+    (date(2025, 4, 30), date(2025, 4, 1)),
+    (date(2025, 4, 30), None),
+    (None, None),
+])
+def test_unchanged_session_range_marks_nothing(previous_end, new_end):
+    cursor = RecordingCursor()
+
+    mark_session_range_dirty(cursor, previous_end, new_end)
+
+    assert cursor.executed == []
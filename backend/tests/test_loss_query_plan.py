@@ -0,0 +1,80 @@
+"""
+EXPLAIN regression test for the daily loss aggregation
+
+Runs against the configured database and skips when it can't be reached or
+holds no distributed sessions yet. Fails when distributed_sessions or
+consumption_daily are no longer read through their station/date indexes.
+"""
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dotenv")
+pytest.importorskip("prometheus_client")
+
+from backend.src.services.proper_loss_calculator import PROBLEMATIC_STATIONS, daily_data_query
+
+# table -> indexes the per-station plan may use
+EXPECTED_KEYS = {
+    'distributed_sessions': {'idx_station_date'},
+    'consumption_daily': {'PRIMARY'},
+}
+
+
+def busiest_station_week(cursor):
+    """Last week of the station with most distributed sessions, or None"""
+    cursor.execute("SHOW TABLES LIKE 'distributed_sessions'")
+    if not cursor.fetchall():
+        return None
+
+    cursor.execute("""
+        SELECT station_id, MAX(interval_15min) as last_interval
+        FROM distributed_sessions
+        GROUP BY station_id
+        ORDER BY COUNT(*) DESC
+    """)
+    for row in cursor.fetchall():
+        if row['station_id'] not in PROBLEMATIC_STATIONS:
+            last_date = row['last_interval'].date()
+            return row['station_id'], last_date - timedelta(days=6), last_date
+    return None
+
+
+def plan_problems(plan):
+    problems = []
+    for table, keys in EXPECTED_KEYS.items():
+        rows = [row for row in plan if row['table'] == table]
+        if not rows:
+            problems.append(f"{table}: not in plan")
+        for row in rows:
+            if row['type'] == 'ALL' or row['key'] is None:
+                problems.append(f"{table}: full scan (type={row['type']}, key={row['key']})")
+            elif row['key'] not in keys:
+                problems.append(f"{table}: uses {row['key']}, expected {sorted(keys)}")
+    return problems
+
+
+def test_daily_loss_query_uses_station_date_indexes(mysql_cursor):
+    week = busiest_station_week(mysql_cursor)
+    if week is None:
+        pytest.skip("distributed_sessions is empty, run a recalculation first")
+    station_id, first_date, last_date = week
+
+    query, params = daily_data_query(first_date, last_date, station_id)
+    mysql_cursor.execute("EXPLAIN " + query, params)
+    plan = mysql_cursor.fetchall()
+
+    assert plan_problems(plan) == []
+
+
+def test_plan_problems_flags_full_scans_and_missing_keys():
+    plan = [
+        {'table': 'consumption_daily', 'type': 'range', 'key': 'PRIMARY'},
+        {'table': 'distributed_sessions', 'type': 'ALL', 'key': None},
+    ]
+    assert plan_problems(plan) == ["distributed_sessions: full scan (type=ALL, key=None)"]
+
+    plan[1] = {'table': 'distributed_sessions', 'type': 'ref', 'key': 'idx_station_date'}
+    assert plan_problems(plan) == []
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from starlette.requests import Request
+
+from backend.src.services import response_cache as cache_module
+from backend.src.services.response_cache import ResponseCache, cached_response
+
+
+def request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/api/stations", "query_string": b"", "headers": headers})
+
+
+def test_etag_survives_version_bump_for_identical_body():
+    cache = ResponseCache()
+    first = cache.put("stations", b'{"success": true}', cache.version)
+
+    cache.bump_version()
+    assert cache.get("stations") is None
+    rebuilt = cache.put("stations", b'{"success": true}', cache.version)
+
+    assert rebuilt.etag == first.etag
+    assert cache.put("stations", b'{"success": false}', cache.version).etag != first.etag
+
+
+def test_revalidation_after_sync_returns_304(monkeypatch):
+    monkeypatch.setattr(cache_module, "response_cache", ResponseCache())
+
+    async def build():
+        return {"success": True, "data": [1, 2, 3]}
+
+    async def scenario():
+        first = await cached_response(request(), build)
+        cache_module.bump_data_version()
+        return first, await cached_response(request(first.headers["etag"]), build)
+
+    first, revalidated = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert revalidated.status_code == 304
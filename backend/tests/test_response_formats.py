@@ -0,0 +1,43 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+
+from backend.src.services.response_formats import COLUMNAR, JSON, columnar_payload, resolve_format
+
+ROWS = [
+    {'id': 2, 'timestamp': datetime(2025, 3, 16, 0, 15), 'station_id': 3, 'active_power_kwh': Decimal('1.250'),
+     'station_code': 'UR367', 'station_name': 'UR367'},
+    {'id': 1, 'timestamp': datetime(2025, 3, 16, 0, 0), 'station_id': 4, 'active_power_kwh': Decimal('0.500'),
+     'station_code': 'UR368', 'station_name': 'UR368'},
+]
+
+
+def test_columnar_payload_has_parallel_arrays_and_station_lookup():
+    payload = columnar_payload(ROWS)
+
+    assert payload['count'] == 2
+    assert payload['columns'] == {
+        'id': [2, 1],
+        'timestamp': ['2025-03-16T00:15:00', '2025-03-16T00:00:00'],
+        'station_id': [3, 4],
+        'active_power_kwh': [1.25, 0.5],
+    }
+    assert payload['stations'] == {
+        3: {'station_code': 'UR367', 'station_name': 'UR367'},
+        4: {'station_code': 'UR368', 'station_name': 'UR368'},
+    }
+
+
+def test_resolve_format():
+    assert resolve_format(None, None) == JSON
+    assert resolve_format('COLUMNAR', 'application/json') == COLUMNAR
+    assert resolve_format(None, 'text/html, application/x-columnar+json;q=0.9') == COLUMNAR
+
+    with pytest.raises(HTTPException) as error:
+        resolve_format('xml', None)
+    assert error.value.status_code == 400
\ No newline at end of file
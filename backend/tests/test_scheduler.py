@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("numpy")
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dotenv")
+pytest.importorskip("prometheus_client")
+
+from backend.src.config import settings
+from backend.src.services.scheduler import INITIAL, MANUAL, SCHEDULED, DataScheduler
+
+
+class FakeJasperClient:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeSyncService:
+    """Records sync calls; every sync takes a moment and loads one record"""
+
+    def __init__(self):
+        self.jasper_client = FakeJasperClient()
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def sync_all_stations(self):
+        self.calls.append("sync")
+        await self.release.wait()
+        return 1
+
+    async def initial_sync(self, days_back):
+        self.calls.append(("initial", days_back))
+        await self.release.wait()
+        return 1
+
+    def take_touched_partitions(self):
+        return set()
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setitem(settings.jasper_config, 'api_key', 'key')
+    monkeypatch.setitem(settings.jasper_config, 'domain_id', 'domain')
+
+    scheduler = DataScheduler()
+    scheduler.sync_service = FakeSyncService()
+    scheduler.post_sync_losses = False
+    return scheduler
+
+
+def test_initial_sync_waits_for_running_sync(scheduler):
+    async def scenario():
+        scheduled = asyncio.create_task(scheduler.run_sync(SCHEDULED))
+        await asyncio.sleep(0)
+        initial = asyncio.create_task(scheduler.run_sync(INITIAL, days_back=7))
+        manual = asyncio.create_task(scheduler.run_sync(MANUAL))
+        await asyncio.sleep(0.01)
+
+        # The initial sync doesn't start next to the scheduled one
+        assert scheduler.sync_service.calls == ["sync"]
+        scheduler.sync_service.release.set()
+        return await scheduled, await initial, await manual
+
+    scheduled, initial, manual = asyncio.run(scenario())
+
+    assert scheduler.sync_service.calls == ["sync", ("initial", 7)]
+    assert not scheduled["coalesced"]
+    assert not initial["coalesced"] and initial["trigger"] == INITIAL
+    assert manual["coalesced"] and manual["trigger"] == SCHEDULED
+
+
+def test_initial_sync_joins_initial_sync_reaching_as_far(scheduler):
+    async def scenario():
+        first = asyncio.create_task(scheduler.run_sync(INITIAL, days_back=30))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(scheduler.run_sync(INITIAL, days_back=7))
+        await asyncio.sleep(0.01)
+        scheduler.sync_service.release.set()
+        return await first, await second
+
+    first, second = asyncio.run(scenario())
+
+    assert scheduler.sync_service.calls == [("initial", 30)]
+    assert second["coalesced"]
+
+
+def test_stop_cancels_running_sync_and_closes_client(scheduler):
+    async def scenario():
+        scheduler.is_running = True
+        run = asyncio.create_task(scheduler.run_sync(MANUAL))
+        await asyncio.sleep(0.01)
+
+        await scheduler.stop()
+
+        with pytest.raises(asyncio.CancelledError):
+            await run
+
+    asyncio.run(scenario())
+
+    assert scheduler._current_run.cancelled()
+    assert scheduler.sync_service.jasper_client.closed
@@ -0,0 +1,68 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from backend.src.services.session_distributor import distribute_sessions
+
+
+def session(session_id, start, end, total_kwh, station_id=3):
+    return {'id': session_id, 'station_id': station_id, 'start_date': start, 'end_date': end, 'total_kwh': total_kwh}
+
+
+def test_session_split_by_overlap():
+    # 10:05 -> 10:35: 10 min in 10:00, 15 in 10:15, 5 in 10:30
+    records, skipped = distribute_sessions([
+        session(1, datetime(2025, 3, 20, 10, 5), datetime(2025, 3, 20, 10, 35), Decimal('6.000'))
+    ])
+
+    assert skipped == 0
+    assert [(r[0], r[1], r[2]) for r in records] == [
+        (1, 3, datetime(2025, 3, 20, 10, 0)),
+        (1, 3, datetime(2025, 3, 20, 10, 15)),
+        (1, 3, datetime(2025, 3, 20, 10, 30)),
+    ]
+    assert [r[3] for r in records] == pytest.approx([2.0, 3.0, 1.0])
+    assert [r[4] for r in records] == pytest.approx([1 / 3, 1 / 2, 1 / 6])
+    assert [r[5] for r in records] == pytest.approx([10, 15, 5])
+
+
+def test_end_on_interval_boundary_adds_no_empty_interval():
+    records, _ = distribute_sessions([
+        session(1, datetime(2025, 3, 20, 23, 30), datetime(2025, 3, 21, 0, 0), 4)
+    ])
+
+    assert [r[2] for r in records] == [datetime(2025, 3, 20, 23, 30), datetime(2025, 3, 20, 23, 45)]
+    assert sum(r[3] for r in records) == pytest.approx(4)
+
+
+def test_zero_and_negative_durations_are_skipped():
+    start = datetime(2025, 3, 20, 8, 0)
+    records, skipped = distribute_sessions([
+        session(1, start, start, 5),
+        session(2, start, datetime(2025, 3, 20, 7, 0), 5),
+        session(3, start, datetime(2025, 3, 20, 8, 10), 5),
+    ])
+
+    assert skipped == 2
+    assert {r[0] for r in records} == {3}
+
+
+def test_energy_is_conserved_per_session():
+    sessions = [
+        session(i, datetime(2025, 3, 20, i % 24, (7 * i) % 60, (13 * i) % 60),
+                datetime(2025, 3, 21, (5 * i) % 24, (11 * i) % 60), 10 + i)
+        for i in range(1, 50)
+    ]
+    records, skipped = distribute_sessions(sessions)
+
+    assert skipped == 0
+    for s in sessions:
+        assert sum(r[3] for r in records if r[0] == s['id']) == pytest.approx(float(s['total_kwh']))
+        assert sum(r[4] for r in records if r[0] == s['id']) == pytest.approx(1)
+
+
+def test_empty_input():
+    assert distribute_sessions([]) == ([], 0)
\ No newline at end of file
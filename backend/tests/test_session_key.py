@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("numpy")
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dotenv")
+pytest.importorskip("prometheus_client")
+
+from backend.src.services.data_processor import (
+    SESSION_COLUMNS, backfill_session_keys, content_hash, normalize_card, prepare_session_chunk, session_key
+)
+
+CSV = """Charger;Start Date;End Date;Total kWh;Start Card
+UR371, AC 1;2025-03-20 10:00:00;2025-03-20 11:10:00;12,5;12345
+UR371, AC 2;2025-03-20 12:00:00;2025-03-20 12:40:00;3,25;
+UR371, AC 1;2025-03-20 14:00:00;2025-03-20 14:05:00;0;67890
+"""
+STATIONS = {'UR371': 1}
+
+
+def new_records():
+    return prepare_session_chunk(pd.read_csv(io.StringIO(CSV), sep=';', decimal=',', dtype={'Start Card': str}), STATIONS)
+
+
+def legacy_cards():
+    """Cards as stored by the original import, which let pandas infer the dtype"""
+    cards = pd.read_csv(io.StringIO(CSV), sep=';', decimal=',')['Start Card']
+    return [None if pd.isna(card) else str(card) for card in cards]
+
+
+def test_legacy_card_and_new_csv_row_share_key():
+    # A numeric card column with blanks is inferred as float
+    stored_card = legacy_cards()[0]
+    assert stored_card == '12345.0'
+
+    new_record = new_records()[0]
+    assert new_record[5] == '12345'
+    assert session_key(new_record[:5] + (stored_card,) + new_record[6:]) == session_key(new_record)
+
+
+def test_sql_backfill_matches_python_keys(mysql_cursor):
+    mysql_cursor.execute("SHOW TABLES LIKE 'charging_sessions'")
+    if not mysql_cursor.fetchall():
+        pytest.skip("charging_sessions doesn't exist")
+
+    # Same column types as the real table, so DECIMAL and DATETIME render the same way
+    mysql_cursor.execute("CREATE TEMPORARY TABLE session_key_check LIKE charging_sessions")
+    try:
+        mysql_cursor.execute("SHOW COLUMNS FROM session_key_check LIKE 'session_key'")
+        if not mysql_cursor.fetchall():
+            mysql_cursor.execute(
+                "ALTER TABLE session_key_check ADD COLUMN session_key CHAR(40) NULL, ADD COLUMN content_hash CHAR(40) NULL"
+            )
+
+        records = new_records()
+        mysql_cursor.executemany(f"""
+            INSERT INTO session_key_check ({', '.join(SESSION_COLUMNS)})
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, [record[:5] + (card,) + record[6:] for record, card in zip(records, legacy_cards())])
+
+        backfill_session_keys(mysql_cursor, 'session_key_check')
+
+        mysql_cursor.execute("SELECT session_key, content_hash FROM session_key_check ORDER BY id")
+        assert [(row['session_key'], row['content_hash']) for row in mysql_cursor.fetchall()] == [
+            (session_key(record), content_hash(record)) for record in records
+        ]
+    finally:
+        mysql_cursor.execute("DROP TEMPORARY TABLE IF EXISTS session_key_check")
+
+
+def test_missing_card_stays_null():
+    assert new_records()[1][5] is None
+
+
+def test_session_without_energy_is_kept():
+    # Re-imported with 0 kWh: must still be upserted so its distributed energy is removed
+    assert new_records()[2][4] == 0
+
+
+def test_normalize_card():
+    assert normalize_card('12345.0') == '12345'
+    assert normalize_card(' 12345 ') == '12345'
+    assert normalize_card('AB12.0') == 'AB12.0'
+    assert normalize_card('12345.05') == '12345.05'
+    assert normalize_card(None) is None
\ No newline at end of file
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dotenv")
+pytest.importorskip("prometheus_client")
+
+from backend.src import database
+
+
+class SlowCursor:
+    """Unbuffered cursor stand-in: fetchmany blocks like a read from the server"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.batches = 0
+
+    def execute(self, query, params=()):
+        self.connection.executed.append((query, params))
+        self.connection.unread_result = self.connection.total_batches is None or self.connection.total_batches > 0
+
+    def fetchmany(self, size):
+        with self.connection.using():
+            time.sleep(0.2)
+            total = self.connection.total_batches
+            if total is not None and self.batches >= total:
+                self.connection.unread_result = False
+                return []
+            self.batches += 1
+            return [{"id": self.batches}] * size
+
+    def close(self):
+        with self.connection.using():
+            pass
+
+
+class SlowConnection:
+    def __init__(self, connection_id, total_batches=None):
+        self._guard = threading.Lock()
+        self._users = 0
+        self.concurrent_use = False
+        self.connection_id = connection_id
+        # None streams forever
+        self.total_batches = total_batches
+        self.unread_result = False
+        self.executed = []
+        self.closed = False
+
+    @contextmanager
+    def using(self):
+        # Two threads on one connection at once is exactly what must not happen
+        with self._guard:
+            self._users += 1
+            if self._users > 1:
+                self.concurrent_use = True
+        try:
+            yield
+        finally:
+            with self._guard:
+                self._users -= 1
+
+    def cursor(self, dictionary=False):
+        return SlowCursor(self)
+
+    def rollback(self):
+        with self.using():
+            pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = database.ConnectionPool({}, pool_size=3)
+    connections = []
+    pool.total_batches = None
+
+    def connect():
+        connections.append(SlowConnection(len(connections) + 1, pool.total_batches))
+        return connections[-1]
+
+    monkeypatch.setattr(pool, "_connect", connect)
+    monkeypatch.setattr(database, "_pool", pool)
+    monkeypatch.setattr(database, "_executor", ThreadPoolExecutor(max_workers=3))
+    monkeypatch.setattr(database, "_stream_executor", ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(database, "_stream_slots", None)
+    pool.connections = connections
+    return pool
+
+
+async def wait_for_cleanup(pool):
+    for _ in range(50):
+        if pool.stats()["in_use"] == 0:
+            return
+        await asyncio.sleep(0.05)
+
+
+def test_disconnect_mid_stream_returns_connection(pool):
+    async def scenario():
+        received = asyncio.Event()
+
+        async def consume():
+            async for _ in database.stream_query("SELECT 1", batch_size=10):
+                received.set()
+
+        task = asyncio.create_task(consume())
+        await received.wait()
+        # Client disconnects while the next fetchmany is running on the executor
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        await wait_for_cleanup(pool)
+
+    asyncio.run(scenario())
+
+    assert pool.stats()["in_use"] == 0
+    assert not any(connection.concurrent_use for connection in pool.connections)
+
+
+def test_abandoned_stream_is_killed_not_drained(pool):
+    async def scenario():
+        stream = database.stream_query("SELECT 1", batch_size=10)
+        await stream.__anext__()
+        await stream.aclose()
+        await wait_for_cleanup(pool)
+
+    asyncio.run(scenario())
+
+    streamed, killer = pool.connections
+    assert killer.executed == [("KILL QUERY %s", (streamed.connection_id,))]
+    # Dropped instead of going back to the pool with unread rows
+    assert streamed.closed
+    assert pool.stats()["idle"] == 1
+    assert pool.stats()["discarded"] == 1
+
+
+def test_finished_stream_returns_connection_to_pool(pool):
+    pool.total_batches = 2
+
+    async def scenario():
+        return [rows async for rows in database.stream_query("SELECT 1", batch_size=10)]
+
+    batches = asyncio.run(scenario())
+
+    assert len(batches) == 2
+    [connection] = pool.connections
+    assert not connection.closed
+    assert pool.stats()["idle"] == 1
+    assert pool.stats()["discarded"] == 0
+
+
+def test_streams_leave_a_connection_for_run_db(pool):
+    async def scenario():
+        streams = [database.stream_query("SELECT 1", batch_size=10) for _ in range(pool.pool_size)]
+        opened = [asyncio.ensure_future(stream.__anext__()) for stream in streams]
+        await asyncio.sleep(0.5)
+
+        # max_streams is capped at pool_size - 1, the last stream waits for a slot
+        assert sum(future.done() for future in opened) == pool.pool_size - 1
+        assert await database.run_db(lambda: "free") == "free"
+
+        # Closing a stream hands its slot to the waiting one
+        for future, stream in zip(opened, streams):
+            await future
+            await stream.aclose()
+        await wait_for_cleanup(pool)
+
+    asyncio.run(scenario())
+
+    assert pool.stats()["in_use"] == 0
+
+
+def test_repeated_disconnects_do_not_exhaust_pool(pool):
+    async def scenario():
+        for _ in range(pool.pool_size + 2):
+            stream = database.stream_query("SELECT 1", batch_size=10)
+            await stream.__anext__()
+            await stream.aclose()
+
+    asyncio.run(scenario())
+
+    assert pool.stats()["in_use"] == 0
+
+
+def test_ndjson_stream_ends_with_error_record():
+    pytest.importorskip("fastapi")
+    from backend.src.services.pagination import ndjson_response
+
+    async def batches():
+        yield [{"id": 1}, {"id": 2}]
+        raise Exception("Lost connection to MySQL server during query")
+
+    async def body():
+        response = ndjson_response(batches())
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    lines = asyncio.run(body()).splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {"id": 1},
+        {"id": 2},
+        {"success": False, "error": "Lost connection to MySQL server during query"},
+    ]
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("httpx")
+pytest.importorskip("mysql.connector")
+pytest.importorskip("dotenv")
+pytest.importorskip("prometheus_client")
+
+from backend.src.services.sync_service import SyncService, aggregate_energy
+
+PAYLOAD = {
+    'active_master': [
+        {'timeStamp': '2025-03-16T00:15:00Z', 'value': 8},
+        {'timeStamp': '2025-03-16T00:00:00Z', 'value': -4},
+    ],
+    'active_slave': [
+        {'timeStamp': '2025-03-16T00:00:00Z', 'value': 2},
+    ],
+    'reactive_master': [
+        {'timeStamp': '2025-03-16T00:15:00Z', 'value': '1.2'},
+    ],
+}
+
+EXPECTED = [
+    (datetime(2025, 3, 16, 0, 0, tzinfo=timezone.utc), 1.5, 0),
+    (datetime(2025, 3, 16, 0, 15, tzinfo=timezone.utc), 2.0, 0.3),
+]
+
+
+def test_aggregate_energy_sums_per_timestamp():
+    records = aggregate_energy(PAYLOAD)
+
+    assert [record[0] for record in records] == [expected[0] for expected in EXPECTED]
+    for record, expected in zip(records, EXPECTED):
+        assert record[1] == pytest.approx(expected[1])
+        assert record[2] == pytest.approx(expected[2])
+
+
+def test_aggregate_energy_empty():
+    assert aggregate_energy({}) == []
+    assert aggregate_energy({'active': []}) == []
+
+
+def test_merge_ranges_joins_overlapping_and_nearby_gaps():
+    t = datetime(2025, 3, 16)
+    ranges = [
+        (t + timedelta(hours=5), t + timedelta(hours=6)),
+        (t, t + timedelta(hours=2)),
+        (t + timedelta(hours=1), t + timedelta(hours=3)),
+        # Within GAP_MERGE_TOLERANCE of the previous range
+        (t + timedelta(hours=6, minutes=30), t + timedelta(hours=7)),
+    ]
+
+    assert SyncService.merge_ranges(ranges) == [
+        (t, t + timedelta(hours=3)),
+        (t + timedelta(hours=5), t + timedelta(hours=7)),
+    ]
+
+
+def test_merge_ranges_keeps_distant_gaps_and_contained_ranges():
+    t = datetime(2025, 3, 16)
+    ranges = [
+        (t, t + timedelta(hours=4)),
+        (t + timedelta(hours=1), t + timedelta(hours=2)),
+        (t + timedelta(hours=6), t + timedelta(hours=7)),
+    ]
+
+    assert SyncService.merge_ranges(ranges) == [
+        (t, t + timedelta(hours=4)),
+        (t + timedelta(hours=6), t + timedelta(hours=7)),
+    ]
+    assert SyncService.merge_ranges([]) == []
\ No newline at end of file